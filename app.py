@@ -2,13 +2,32 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from datetime import datetime
 import numpy as np
 import os
+import gzip
 import hashlib
+import io
 import json
+import shutil
+import sqlite3
+import threading
+from contextlib import closing
 from pathlib import Path
 
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    # Without watchdog the data file is checked on every rerun instead
+    Observer = None
+    FileSystemEventHandler = object
+
+# Copy-on-Write: frames derived from the shared dataset never write through to it,
+# and arrays read from it are read-only
+pd.set_option('mode.copy_on_write', True)
+
 # Version check
 VERSION = "1.0.1"
 
@@ -120,6 +139,12 @@ if 'selected_students' not in st.session_state:
     st.session_state['selected_students'] = set()
 if 'selected_student' not in st.session_state:
     st.session_state['selected_student'] = None
+if 'requested_reports' not in st.session_state:
+    st.session_state['requested_reports'] = set()
+if 'requested_exports' not in st.session_state:
+    st.session_state['requested_exports'] = set()
+if 'requested_at_risk_reports' not in st.session_state:
+    st.session_state['requested_at_risk_reports'] = set()
 
 # Custom CSS
 st.markdown("""
@@ -767,6 +792,25 @@ def calculate_progress(row):
         return 0
     return round((row['skills_mastered'] / row['skills_practiced']) * 100)
 
+def round_like_loop(values, decimals=0):
+    """round() as the per-student loops applied it to NumPy float64 scalars, i.e. np.round."""
+    return np.round(values, decimals)
+
+# Dataset versions each per-version cache keeps: the data file (two versions
+# while a new one is swapped in) and every published upload
+DATASET_CACHE_SIZE = 4
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_student_progress(_df, dataset_version):
+    """calculate_progress over each student's summed skills, as one column indexed by student_id."""
+    totals = get_cohort_summary(_df, dataset_version)['subjects'].groupby(level='student_id', sort=False)[
+        ['skills_practiced', 'skills_mastered']
+    ].sum()
+    practiced = totals['skills_practiced'].to_numpy()
+    mastered = totals['skills_mastered'].to_numpy()
+    progress = np.where(practiced == 0, 0, round_like_loop((mastered / np.maximum(1, practiced)) * 100))
+    return pd.Series(progress.astype('int64'), index=totals.index, name='progress')
+
 def get_progress_color(progress):
     if progress >= 80: return '#7ba7c2'  # Lazy Blue Light
     if progress >= 60: return '#5d8aa8'  # Lazy Blue
@@ -781,142 +825,1063 @@ def get_progress_emoji(progress):
     if progress >= 20: return '💫'
     return '🌱'
 
-def get_student_summary(df, student_id, date_filter=None):
-    student_data = df[df['student_id'] == student_id]
+def contiguous_slices(ids):
+    """Map every id of an id-sorted array to its (start, stop) position range."""
+    if len(ids) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    stops = np.r_[starts[1:], len(ids)]
+    return dict(zip(ids[starts].tolist(), zip(starts.tolist(), stops.tolist())))
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_student_index(_df, dataset_version):
+    """Sort the frame once by student and record each student's row range.
+
+    The sort is stable, so every slice keeps the original (newest first) row
+    order and matches what a boolean filter on student_id would return.
+    """
+    step = get_ingest_step(dataset_version)
+    if step is not None:
+        return extend_student_index(get_student_index(step['parent_df'], step['parent']), step['rows'], _df)
+    by_student = _df.sort_values('student_id', kind='stable')
+    return {
+        'frame': by_student,
+        'slices': contiguous_slices(by_student['student_id'].to_numpy())
+    }
+
+def extend_student_index(parent, rows, df):
+    """The student index of df, whose first rows (rows) are newer than the parent's whole dataset.
+
+    Merges rows, sorted by student, into the parent's id-sorted order in one
+    linear pass; within a student the newer rows come first, as a full
+    rebuild would order them. Frames are range-indexed, so labels are
+    positions and the parent's rows sit len(rows) further down in df.
+    """
+    added = rows.sort_values('student_id', kind='stable')
+    old_ids = parent['frame']['student_id'].to_numpy()
+    new_ids = added['student_id'].to_numpy()
+    order = np.empty(len(old_ids) + len(new_ids), dtype=np.intp)
+    order[np.searchsorted(old_ids, new_ids, side='left') + np.arange(len(new_ids))] = added.index.to_numpy()
+    order[np.searchsorted(new_ids, old_ids, side='right') + np.arange(len(old_ids))] = parent['frame'].index.to_numpy() + len(rows)
+    by_student = df.take(order)
+    return {
+        'frame': by_student,
+        'slices': contiguous_slices(by_student['student_id'].to_numpy())
+    }
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_student_directory(_df, dataset_version):
+    """Names and teacher of every student: the newest non-missing value of each.
+
+    'table' is indexed by student_id; 'names' and 'teachers' are plain dicts for
+    O(1) label lookups.
+    """
+    if get_database(_df):
+        # SQLite takes bare columns from the row that has the MIN()
+        table = query_database(_df, "SELECT DISTINCT student_id FROM rows ORDER BY student_id").set_index('student_id')
+        for column in ['first_name', 'last_name', 'teacher_name']:
+            firsts = query_database(_df, f"""
+                SELECT student_id, {quote_column(column)}, MIN(position) FROM rows
+                WHERE {quote_column(column)} IS NOT NULL GROUP BY student_id
+            """).set_index('student_id')[column]
+            table[column] = firsts.astype(object)
+        table = table.astype(object)
+    else:
+        by_student = get_student_index(_df, dataset_version)['frame']
+        table = by_student.groupby('student_id')[['first_name', 'last_name', 'teacher_name']].first().astype(object)
+    table['name'] = table['first_name'].astype(str) + ' ' + table['last_name'].astype(str)
+    return {
+        'table': table,
+        'names': dict(zip(table.index.tolist(), table['name'].tolist())),
+        'teachers': dict(zip(table.index.tolist(), table['teacher_name'].tolist()))
+    }
+
+# Longest substring indexed for search; longer queries are narrowed by their
+# substrings of this length and then checked against the candidates
+SEARCH_GRAM_SIZE = 3
+SEARCH_GATHER_LIMIT = 256
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_search_index(_df, dataset_version):
+    """Substring index over the lowercase first name, last name and ID of every student.
+
+    Distinct field values form a vocabulary; every substring of up to
+    SEARCH_GRAM_SIZE characters maps to the sorted vocabulary entries that
+    contain it. 'owners'/'offsets' map each entry back to students, and
+    'codes' holds the entry of every (field, student) for broad matches.
+    """
+    table = get_student_directory(_df, dataset_version)['table']
+    fields = [
+        table['first_name'].fillna('').astype(str).str.lower().to_numpy(),
+        table['last_name'].fillna('').astype(str).str.lower().to_numpy(),
+        table.index.astype(str).str.lower().to_numpy()
+    ]
+    codes, vocabulary = pd.factorize(np.concatenate(fields))
+    vocabulary = vocabulary.tolist()
+    
+    # Vocabulary entry -> positions (in the directory table) of the students using it
+    order = np.argsort(codes, kind='stable')
+    owners = np.tile(np.arange(len(table)), len(fields))[order]
+    offsets = np.searchsorted(codes[order], np.arange(len(vocabulary) + 1))
+    
+    grams = {}
+    for entry, text in enumerate(vocabulary):
+        for size in range(1, SEARCH_GRAM_SIZE + 1):
+            for start in range(len(text) - size + 1):
+                entries = grams.setdefault(text[start:start + size], [])
+                if not entries or entries[-1] != entry:
+                    entries.append(entry)
+    
+    return {
+        'student_ids': table.index.to_numpy(),
+        'vocabulary': vocabulary,
+        'grams': {gram: np.array(entries) for gram, entries in grams.items()},
+        'owners': owners,
+        'offsets': offsets,
+        'codes': codes.reshape(len(fields), len(table))
+    }
+
+def search_students(df, dataset_version, query, prefix=False):
+    """IDs of students whose first name, last name or ID contains the query (case-insensitive).
+
+    With prefix=True the field has to start with the query instead.
+    """
+    index = get_search_index(df, dataset_version)
+    query = query.lower()
+    if len(query) <= SEARCH_GRAM_SIZE:
+        grams = [query]
+    else:
+        grams = [query[i:i + SEARCH_GRAM_SIZE] for i in range(len(query) - SEARCH_GRAM_SIZE + 1)]
+    
+    postings = [index['grams'].get(gram) for gram in grams]
+    if any(entries is None for entries in postings):
+        return index['student_ids'][:0]
+    postings.sort(key=len)
+    candidates = postings[0]
+    for entries in postings[1:]:
+        candidates = np.intersect1d(candidates, entries, assume_unique=True)
+    
+    # Short queries are answered by the index alone; longer ones and prefixes need a check
+    vocabulary = index['vocabulary']
+    if prefix:
+        candidates = [entry for entry in candidates if vocabulary[entry].startswith(query)]
+    elif len(query) > SEARCH_GRAM_SIZE:
+        candidates = [entry for entry in candidates if query in vocabulary[entry]]
+    if len(candidates) == 0:
+        return index['student_ids'][:0]
+    
+    # Few matching entries: gather their students; many: one pass over the field codes
+    if len(candidates) <= SEARCH_GATHER_LIMIT:
+        owners, offsets = index['owners'], index['offsets']
+        positions = np.unique(np.concatenate([owners[offsets[entry]:offsets[entry + 1]] for entry in candidates]))
+    else:
+        matched = np.zeros(len(vocabulary), dtype=bool)
+        matched[candidates] = True
+        positions = np.flatnonzero(matched[index['codes']].any(axis=0))
+    return index['student_ids'][positions]
+
+def get_student_rows(df, dataset_version, student_id):
+    """Rows for one student, sliced from the student index of the loaded dataset."""
+    if get_database(df):
+        columns = ', '.join(map(quote_column, df['columns']))
+        return restore_rows(query_database(
+            df, f"SELECT {columns} FROM rows WHERE student_id = ? ORDER BY position", [student_id]
+        ))
+    index = get_student_index(df, dataset_version)
+    start, stop = index['slices'].get(student_id, (0, 0))
+    return index['frame'].iloc[start:stop]
+
+# Row-level filters served from precomputed bitmaps
+FILTER_COLUMNS = ['subject', 'teacher_name', 'date', 'Term']
+
+def date_labels(dates):
+    """'YYYY-MM-DD' label of every date, 'Unknown' for missing ones."""
+    return np.where(dates.isna(), 'Unknown', dates.strftime('%Y-%m-%d'))
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_filter_index(_df, dataset_version):
+    """One packed row bitmap per filter value of every FILTER_COLUMNS column.
+
+    'labels' lists the values in order of first appearance, as the filter
+    selectboxes show them. Dates are labelled once per distinct timestamp here,
+    so filtering never formats timestamps. Missing values get no bitmap and
+    match nothing, as an equality test would.
+    """
+    if get_database(_df):
+        # Labels only; the database answers the filters themselves
+        index = {}
+        for column in FILTER_COLUMNS:
+            values = query_database(_df, f"""
+                SELECT {quote_column(column)} AS value FROM rows
+                GROUP BY {quote_column(column)} ORDER BY MIN(position)
+            """)['value']
+            if column == 'date':
+                labels = pd.unique(date_labels(pd.DatetimeIndex(pd.to_datetime(values, unit='s'))))
+            else:
+                labels = values.dropna()
+            index[column] = {'labels': list(labels)}
+        return index
+    index = {'rows': len(_df), 'student_ids': _df['student_id'].to_numpy()}
+    for column in FILTER_COLUMNS:
+        if column == 'date':
+            # Timestamps sharing a day share a label
+            codes, uniques = pd.factorize(_df[column], use_na_sentinel=False)
+            label_codes, labels = pd.factorize(date_labels(pd.DatetimeIndex(uniques)))
+            codes = label_codes[codes]
+        else:
+            codes, labels = pd.factorize(_df[column])
+        labels = labels.tolist()
+        index[column] = {
+            'labels': labels,
+            'bitmaps': {
+                label: np.packbits(codes == code)
+                for code, label in enumerate(labels)
+                if label != 'Unknown' or column != 'date'
+            }
+        }
+    return index
+
+def get_filter_options(df, dataset_version, column):
+    """Values offered by the filter selectbox of a FILTER_COLUMNS column."""
+    return get_filter_index(df, dataset_version)[column]['labels']
+
+def filter_rows(df, dataset_version, **filters):
+    """Boolean row mask of df for column=value filters; "All" or None leaves a column unfiltered.
+
+    Combines the precomputed bitmaps with bitwise AND, so any combination
+    costs a few vectorized passes over n/8 bytes.
+    """
+    index = get_filter_index(df, dataset_version)
+    bits = None
+    for column, value in filters.items():
+        if value is None or value == "All":
+            continue
+        value_bits = index[column]['bitmaps'].get(value)
+        if value_bits is None:
+            return np.zeros(index['rows'], dtype=bool)
+        bits = value_bits if bits is None else bits & value_bits
+    if bits is None:
+        return np.ones(index['rows'], dtype=bool)
+    return np.unpackbits(bits, count=index['rows']).view(bool)
+
+def filter_students(df, dataset_version, **filters):
+    """IDs of students with at least one row matching filter_rows, in order of first appearance."""
+    if get_database(df):
+        return filter_database_students(df, filters)
+    student_ids = get_filter_index(df, dataset_version)['student_ids']
+    return pd.unique(student_ids[filter_rows(df, dataset_version, **filters)])
+
+def aggregate_subjects(rows):
+    """Summed counts and row count per (student, subject), in order of first appearance."""
+    return rows.groupby(['student_id', 'subject'], sort=False, observed=True).agg(
+        questions=('questions_answered', 'sum'),
+        skills_practiced=('skills_practiced', 'sum'),
+        skills_mastered=('skills_mastered', 'sum'),
+        row_count=('questions_answered', 'size')
+    ).astype('int64')
+
+def extend_subject_totals(totals, added):
+    """aggregate_subjects totals with the totals of newer rows added in.
+
+    Within a student the subjects of the newer rows come first, then the
+    rest in their previous order, as aggregating the combined rows would
+    list them.
+    """
+    combined = pd.concat([added, totals]).groupby(level=['student_id', 'subject'], sort=False, observed=True).sum()
+    order = np.argsort(combined.index.get_level_values('student_id'), kind='stable')
+    return combined.iloc[order]
+
+def filter_database_students(df, filters):
+    """filter_students for a database handle: the filters become a WHERE clause on indexed columns."""
+    conditions, params = [], []
+    for column, value in filters.items():
+        if value is None or value == "All":
+            continue
+        if column not in FILTER_COLUMNS:
+            raise KeyError(column)
+        if column == 'date':
+            day = pd.to_datetime(value, format='%Y-%m-%d', errors='coerce')
+            if pd.isna(day):
+                return np.array([], dtype='int64')
+            conditions.append('date >= ? AND date < ?')
+            params += [int(day.timestamp()), int((day + pd.Timedelta(days=1)).timestamp())]
+        else:
+            conditions.append(f"{quote_column(column)} = ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return query_database(
+        df, f"SELECT student_id FROM rows {where} GROUP BY student_id ORDER BY MIN(position)", params
+    )['student_id'].to_numpy()
+
+def summarize_subjects(rows):
+    """Totals and predicted growth per (student, subject) for a long-format frame.
+
+    Groups come out in order of first appearance.
+    """
+    return subject_metrics(aggregate_subjects(rows))
+
+def subject_metrics(totals):
+    """Progress and predicted growth from aggregate_subjects totals.
+
+    The rounding steps mirror the original per-subject loop, so the numbers
+    match it exactly.
+    """
+    table = totals.copy()
+    questions = table['questions'].to_numpy()
+    practiced = table['skills_practiced'].to_numpy()
+    mastered = table['skills_mastered'].to_numpy()
+    
+    # Calculate progress
+    table['progress'] = np.where(practiced > 0, round_like_loop((mastered / np.maximum(1, practiced)) * 100), 0).astype('int64')
+    
+    # Calculate predictive growth
+    table['mastery_rate'] = round_like_loop((mastered / np.maximum(1, practiced)) * 100, 1)
+    table['efficiency'] = round_like_loop((mastered / np.maximum(1, questions)) * 100, 1)
+    table['questions_per_day'] = round_like_loop(questions / np.maximum(1, table['row_count'].to_numpy()), 1)
+    
+    # Weighted growth: 40% mastery rate, 40% efficiency, 20% questions per day (capped at 20)
+    predicted_growth = round_like_loop(
+        (table['mastery_rate'] * 0.4) +
+        (table['efficiency'] * 0.4) +
+        (np.minimum(table['questions_per_day'], 20) * 0.2)
+    )
+    
+    # 20% boost for students who need more help, 20% reduction for high performers
+    table['predicted_growth'] = predicted_growth * np.select(
+        [table['progress'] < 30, table['progress'] > 80], [1.2, 0.8], default=1.0
+    )
+    
+    return table[['questions', 'skills_practiced', 'skills_mastered', 'progress',
+                  'questions_per_day', 'mastery_rate', 'efficiency', 'predicted_growth']]
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_cohort_summary(_df, dataset_version):
+    """Subject breakdown for every student, computed once per dataset version.
+
+    Built from the student index, so each student's subjects are contiguous;
+    'slices' maps student_id to that row range.
+    """
+    step = get_ingest_step(dataset_version)
+    if step is not None:
+        parent = get_cohort_summary(step['parent_df'], step['parent'])
+        added = aggregate_subjects(step['rows'].sort_values('student_id', kind='stable'))
+        totals = extend_subject_totals(parent['totals'], added)
+    elif get_database(_df):
+        totals = query_database(_df, """
+            SELECT student_id, subject, SUM(questions_answered) AS questions,
+                   SUM(skills_practiced) AS skills_practiced, SUM(skills_mastered) AS skills_mastered,
+                   COUNT(*) AS row_count
+            FROM rows WHERE subject IS NOT NULL
+            GROUP BY student_id, subject ORDER BY student_id, MIN(position)
+        """).set_index(['student_id', 'subject'])
+    else:
+        totals = aggregate_subjects(get_student_index(_df, dataset_version)['frame'])
+    subjects = subject_metrics(totals)
+    return {
+        'totals': totals,
+        'subjects': subjects,
+        'slices': contiguous_slices(subjects.index.get_level_values('student_id').to_numpy())
+    }
+
+def get_student_summary(df, dataset_version, student_id, date_filter=None):
+    student_data = get_student_rows(df, dataset_version, student_id)
+    date_filtered = False
     
     # Apply date filter if specified
     if date_filter and date_filter != "All":
         try:
             filter_date = pd.to_datetime(date_filter)
-            student_data = student_data[student_data['date'].dt.date == filter_date.date()]
+            student_data = student_data[student_data['date'].dt.normalize() == filter_date.normalize()]
+            date_filtered = True
         except:
             st.warning("Invalid date format. Showing all data.")
     
     if student_data.empty:
         return None
     
-    # Calculate overall totals
-    total_questions = student_data['questions_answered'].sum()
-    total_skills_practiced = student_data['skills_practiced'].sum()
-    total_skills_mastered = student_data['skills_mastered'].sum()
-    
-    # Calculate subject breakdown
-    subject_breakdown = {}
-    for subject in student_data['subject'].unique():
-        subject_data = student_data[student_data['subject'] == subject]
-        
-        # Calculate subject totals
-        subject_questions = subject_data['questions_answered'].sum()
-        subject_skills_practiced = subject_data['skills_practiced'].sum()
-        subject_skills_mastered = subject_data['skills_mastered'].sum()
-        
-        # Calculate progress
-        progress = 0
-        if subject_skills_practiced > 0:
-            progress = round((subject_skills_mastered / subject_skills_practiced) * 100)
-        
-        # Calculate predictive growth
-        mastery_rate = round((subject_skills_mastered / max(1, subject_skills_practiced)) * 100, 1)
-        efficiency = round((subject_skills_mastered / max(1, subject_questions)) * 100, 1)
-        questions_per_day = round(subject_questions / max(1, len(subject_data)), 1)
-        
-        # Weighted growth calculation
-        predicted_growth = round(
-            (mastery_rate * 0.4) +  # 40% weight on mastery rate
-            (efficiency * 0.4) +    # 40% weight on efficiency
-            (min(questions_per_day, 20) * 0.2)  # 20% weight on questions per day, capped at 20
-        )
-        
-        # Adjust growth based on current progress
-        if progress < 30:
-            predicted_growth *= 1.2  # 20% boost for students who need more help
-        elif progress > 80:
-            predicted_growth *= 0.8  # 20% reduction for already high-performing students
-        
-        subject_breakdown[subject] = {
-            'questions': subject_questions,
-            'skills_practiced': subject_skills_practiced,
-            'skills_mastered': subject_skills_mastered,
-            'progress': progress,
-            'questions_per_day': questions_per_day,
-            'mastery_rate': mastery_rate,
-            'efficiency': efficiency,
-            'predicted_growth': predicted_growth
-        }
+    # The cohort table covers all dates; a single date is summarized on the fly
+    if date_filtered:
+        subjects = summarize_subjects(student_data)
+    else:
+        cohort = get_cohort_summary(df, dataset_version)
+        start, stop = cohort['slices'][student_id]
+        subjects = cohort['subjects'].iloc[start:stop]
+    subjects = subjects.droplevel('student_id')
+    directory = get_student_directory(df, dataset_version)
     
     return {
-        'name': f"{student_data['first_name'].iloc[0]} {student_data['last_name'].iloc[0]}",
-        'teacher': student_data['teacher_name'].iloc[0],
-        'subjects': student_data['subject'].unique(),
-        'total_questions': total_questions,
-        'total_skills_practiced': total_skills_practiced,
-        'total_skills_mastered': total_skills_mastered,
+        'name': directory['names'][student_id],
+        'teacher': directory['teachers'][student_id],
+        'subjects': subjects.index.to_numpy(),
+        'total_questions': subjects['questions'].sum(),
+        'total_skills_practiced': subjects['skills_practiced'].sum(),
+        'total_skills_mastered': subjects['skills_mastered'].sum(),
         'latest_date': student_data['date'].max(),
-        'subject_breakdown': subject_breakdown,
+        'subject_breakdown': subjects.to_dict('index'),
         'timeline_data': student_data.sort_values('date')[['date', 'subject', 'questions_answered', 'skills_mastered']].to_dict('records')
     }
 
+# Chart template: only the Streamlit color placeholders (the frontend swaps in
+# the theme palette). Streamlit merges its own chart theme into the template,
+# so the dashboard styling below stays in each figure's layout
+pio.templates['dashboard'] = go.layout.Template(
+    layout=dict(colorway=pio.templates['streamlit'].layout.colorway)
+)
+
+# Sequential colorscale of the Streamlit theme (placeholders as well), for traces that use one
+CHART_COLORSCALE = pio.templates['streamlit'].layout.colorscale.sequential
+
+# Dashboard chart styling, shared by every figure
+CHART_FONT = dict(color='black', size=12, family='Arial')
+CHART_TICK_FONT = dict(CHART_FONT, size=10)
+CHART_AXIS = dict(title_font=CHART_FONT, tickfont=CHART_TICK_FONT)
+
+def chart_title(text, size=18):
+    """Centered black Arial title near the top of a chart."""
+    return dict(text=text, x=0.5, xanchor='center', y=0.95, yanchor='top', font=dict(CHART_FONT, size=size))
+
+def chart_layout(title, **layout):
+    """The dashboard's chart layout: template, title, fonts, axes and white background, plus layout."""
+    return dict(
+        dict(template='dashboard', title=chart_title(title), font=CHART_FONT,
+             xaxis=CHART_AXIS, yaxis=CHART_AXIS, plot_bgcolor='white', paper_bgcolor='white'),
+        **layout
+    )
+
+# Built charts kept across reruns and sessions; the least recently used go first
+FIGURE_CACHE_SIZE = 256
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_SIZE)
 def draw_donut_chart(subject, start_val, end_val, term):
-    """Create a donut chart showing start vs end percentiles."""
-    fig = go.Figure()
-    
-    fig.add_trace(go.Pie(
-        values=[start_val, end_val],
-        labels=["Start", "End"],
-        marker=dict(colors=["#FFA15A", "#00CC96"]),
-        hole=0.6,
-        textinfo='label+value',
-        hoverinfo='label+value+percent',
-        texttemplate='%{label}<br>%{value:.0f}',
-        insidetextorientation='horizontal',
-        sort=False,
-        direction='clockwise',
-        rotation=180,
-        textfont=dict(
-            color='black',
-            size=14,
-            family='Arial'
+    """Create a donut chart showing start vs end percentiles (built once per set of values)."""
+    return go.Figure(
+        data=[go.Pie(
+            values=[start_val, end_val],
+            labels=["Start", "End"],
+            marker=dict(colors=["#FFA15A", "#00CC96"]),
+            hole=0.6,
+            textinfo='label+value',
+            hoverinfo='label+value+percent',
+            texttemplate='%{label}<br>%{value:.0f}',
+            insidetextorientation='horizontal',
+            sort=False,
+            direction='clockwise',
+            rotation=180,
+            textfont=dict(CHART_FONT, size=14),
+            textposition='inside'
+        )],
+        layout=dict(
+            template='dashboard',
+            title=chart_title(f"<b>{subject} Percentile ({term})</b><br><span style='font-size:12px'>Start vs. End</span>", size=20),
+            showlegend=False,
+            paper_bgcolor='white',
+            plot_bgcolor='white',
+            font=CHART_FONT,
+            margin=dict(t=50, b=20, l=20, r=20)
+        )
+    )
+
+def draw_timeline_chart(summary):
+    """Skills mastered over time, one line per subject."""
+    timeline_df = pd.DataFrame(summary['timeline_data'])
+    timeline_df['date'] = pd.to_datetime(timeline_df['date'])
+    
+    traces = []
+    for subject in timeline_df['subject'].unique():
+        subject_data = timeline_df[timeline_df['subject'] == subject]
+        traces.append(go.Scatter(
+            x=subject_data['date'],
+            y=subject_data['skills_mastered'],
+            name=f'{subject} Skills Mastered',
+            mode='lines+markers',
+            line=dict(width=2),
+            marker=dict(size=8)
+        ))
+    
+    return go.Figure(data=traces, layout=chart_layout(
+        'Progress Over Time',
+        xaxis_title_text='Date',
+        yaxis_title_text='Skills Mastered',
+        hovermode='x unified',
+        showlegend=True,
+        legend=dict(
+            yanchor="top",
+            y=-0.15,
+            xanchor="center",
+            x=0.5,
+            bgcolor='rgba(255, 255, 255, 0.8)',
+            bordercolor='rgba(0, 0, 0, 0.1)',
+            borderwidth=1,
+            font=CHART_FONT,
+            orientation='h'
         ),
-        textposition='inside'
+        margin=dict(t=50, b=100, l=50, r=50)
+    ))
+
+def subject_bars(summary):
+    """Progress, mastery rate and efficiency bars, one group per subject."""
+    breakdown = summary['subject_breakdown']
+    subjects = list(breakdown.keys())
+    return [
+        go.Bar(name=name, x=subjects, y=[data[metric] for data in breakdown.values()], marker_color=color)
+        for name, metric, color in [
+            ('Progress', 'progress', '#7ba7c2'),
+            ('Mastery Rate', 'mastery_rate', '#5d8aa8'),
+            ('Efficiency', 'efficiency', '#d1b280')
+        ]
+    ]
+
+def draw_subject_chart(summary):
+    """Progress, mastery rate and efficiency per subject, as shown on the dashboard."""
+    return go.Figure(data=subject_bars(summary), layout=chart_layout(
+        'Subject Performance Comparison',
+        barmode='group',
+        xaxis_title_text='Subject',
+        yaxis_title_text='Percentage'
+    ))
+
+def draw_comparison_subject_chart(summary):
+    """Progress, mastery rate and efficiency per subject, as shown in the Comparison View."""
+    return go.Figure(data=subject_bars(summary), layout=dict(
+        template='dashboard',
+        barmode='group',
+        title='Subject Performance Comparison',
+        xaxis_title='Subject',
+        yaxis_title='Percentage',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
     ))
+
+def draw_skills_chart(summary):
+    """Skills practiced and mastered per subject."""
+    traces = []
+    for subject, subject_data in summary['subject_breakdown'].items():
+        counts = [subject_data['skills_practiced'], subject_data['skills_mastered']]
+        traces.append(go.Bar(
+            name=subject,
+            x=['Skills Practiced', 'Skills Mastered'],
+            y=counts,
+            text=counts,
+            textposition='auto',
+            textfont=CHART_FONT
+        ))
     
-    fig.update_layout(
-        title={
-            'text': f"<b>{subject} Percentile ({term})</b><br><span style='font-size:12px'>Start vs. End</span>",
-            'x': 0.5,
-            'xanchor': 'center',
-            'y': 0.95,
-            'yanchor': 'top',
-            'font': dict(
-                color='black',
-                size=20,
-                family='Arial'
-            )
-        },
-        showlegend=False,
-        paper_bgcolor='white',
+    return go.Figure(data=traces, layout=dict(
+        template='dashboard',
+        title=dict(text='Skills Progress by Subject', font=dict(CHART_FONT, size=18), x=0.5, y=0.95),
+        barmode='group',
+        xaxis_title='Metric',
+        yaxis_title='Count',
         plot_bgcolor='white',
-        font=dict(
-            color='black',
-            size=12,
-            family='Arial'
-        ),
-        margin=dict(t=50, b=20, l=20, r=20)
+        paper_bgcolor='white',
+        font=CHART_FONT,
+        xaxis=dict(tickfont=CHART_TICK_FONT),
+        yaxis=dict(tickfont=CHART_TICK_FONT),
+        margin=dict(t=50, b=50, l=50, r=50)
+    ))
+
+# Diagnostic level charts by kind: (subject label, column, bar color)
+DIAGNOSTIC_CHARTS = {
+    'math_levels': ('Math', 'Ending diagnostic level - Math', '#2196F3'),
+    'ela_levels': ('ELA', 'Ending diagnostic level - ELA', '#FFC107')
+}
+
+def draw_diagnostic_chart(student_data, kind):
+    """A subject's ending diagnostic level per export date, from the student's rows in date order."""
+    subject, column, color = DIAGNOSTIC_CHARTS[kind]
+    return go.Figure(
+        data=[go.Bar(
+            x=student_data['date'].dt.strftime('%Y-%m-%d'),
+            y=student_data[column],
+            name=f'{subject} Level',
+            marker_color=color,
+            text=student_data[column],
+            textposition='outside',
+            textfont=CHART_FONT,
+            hovertemplate='Date: %{x}<br>Level: %{y}<extra></extra>'
+        )],
+        layout=chart_layout(
+            f'{subject} Diagnostic Level Over Time',
+            xaxis=dict(CHART_AXIS, tickangle=45),
+            xaxis_title_text='Date',
+            yaxis_title_text='Diagnostic Level',
+            height=400,
+            margin=dict(t=50, b=50, l=50, r=50)
+        )
+    )
+
+# Student charts drawn from the student's summary, by kind
+SUMMARY_CHARTS = {
+    'timeline': draw_timeline_chart,
+    'subjects': draw_subject_chart,
+    'comparison_subjects': draw_comparison_subject_chart,
+    'skills': draw_skills_chart
+}
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_SIZE)
+def get_student_figure(_df, dataset_version, student_id, kind, date_filter=None):
+    """One of a student's charts (a SUMMARY_CHARTS or DIAGNOSTIC_CHARTS kind), built once per version.
+
+    Reopening a student or changing an unrelated widget reuses the figure.
+    Figures are never modified once built, so all sessions share them.
+    """
+    if kind in DIAGNOSTIC_CHARTS:
+        return draw_diagnostic_chart(get_student_rows(_df, dataset_version, student_id).sort_values('date'), kind)
+    return SUMMARY_CHARTS[kind](get_student_summary(_df, dataset_version, student_id, date_filter))
+
+# Latest diagnostic levels compared across students
+DIAGNOSTIC_LEVEL_COLUMNS = [
+    'Starting diagnostic level - Math',
+    'Ending diagnostic level - Math',
+    'Starting diagnostic level - ELA',
+    'Ending diagnostic level - ELA'
+]
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_diagnostic_levels(_df, dataset_version):
+    """Latest recorded value of each DIAGNOSTIC_LEVEL_COLUMNS column, one row per student.
+
+    The latest value is the first non-missing one in dataset order (newest
+    first); students without any stay NaN.
+    """
+    step = get_ingest_step(dataset_version)
+    if step is not None:
+        parent = get_diagnostic_levels(step['parent_df'], step['parent'])
+        added = step['rows'].groupby('student_id', sort=False)[[
+            column for column in DIAGNOSTIC_LEVEL_COLUMNS if column in step['rows'].columns
+        ]].first()
+        return added.reindex(columns=DIAGNOSTIC_LEVEL_COLUMNS).astype('float64').combine_first(parent)[DIAGNOSTIC_LEVEL_COLUMNS]
+    if get_database(_df):
+        levels = query_database(_df, "SELECT DISTINCT student_id FROM rows").set_index('student_id')
+        for column in DIAGNOSTIC_LEVEL_COLUMNS:
+            if column in _df['columns']:
+                # SQLite takes bare columns from the row that has the MIN()
+                latest = query_database(_df, f"""
+                    SELECT student_id, {quote_column(column)}, MIN(position) FROM rows
+                    WHERE {quote_column(column)} IS NOT NULL GROUP BY student_id
+                """).set_index('student_id')[column]
+                levels[column] = latest
+        return levels.reindex(columns=DIAGNOSTIC_LEVEL_COLUMNS).astype('float64')
+    by_student = get_student_index(_df, dataset_version)['frame']
+    columns = [column for column in DIAGNOSTIC_LEVEL_COLUMNS if column in by_student.columns]
+    levels = by_student.groupby('student_id', sort=False)[columns].first()
+    return levels.reindex(columns=DIAGNOSTIC_LEVEL_COLUMNS).astype('float64')
+
+# Columns of the comparison matrix: per-subject metrics (averaged over the
+# student's subjects) and latest diagnostic levels, with their labels
+COMPARISON_METRICS = {
+    'progress': 'Progress',
+    'mastery_rate': 'Mastery Rate',
+    'efficiency': 'Efficiency',
+    'predicted_growth': 'Predicted Growth',
+    'Ending diagnostic level - Math': 'Math Level',
+    'Ending diagnostic level - ELA': 'ELA Level'
+}
+
+def get_comparison_matrix(df, dataset_version, student_ids):
+    """Students x COMPARISON_METRICS for the given students, from the per-version tables.
+
+    Rows follow student_ids (students without data are left out) and are
+    labelled "name (ID)".
+    """
+    cohort = get_cohort_summary(df, dataset_version)
+    student_ids = [student_id for student_id in student_ids if student_id in cohort['slices']]
+    rows = np.concatenate([np.arange(*cohort['slices'][student_id]) for student_id in student_ids] or [np.arange(0)])
+    subjects = cohort['subjects'].iloc[rows]
+    metrics = [column for column in COMPARISON_METRICS if column in subjects.columns]
+    matrix = subjects.groupby(level='student_id', sort=False)[metrics].mean().round(1)
+    levels = get_diagnostic_levels(df, dataset_version)
+    matrix = matrix.join(levels[[column for column in COMPARISON_METRICS if column in levels.columns]])
+    names = get_student_directory(df, dataset_version)['names']
+    matrix.index = [f"{names[student_id]} ({student_id})" for student_id in matrix.index]
+    return matrix.rename(columns=COMPARISON_METRICS)
+
+def draw_comparison_bars(matrix):
+    """Subject metrics side by side: one bar group per student, one trace per metric."""
+    colors = {'Progress': '#7ba7c2', 'Mastery Rate': '#5d8aa8', 'Efficiency': '#d1b280', 'Predicted Growth': '#9bc995'}
+    return go.Figure(
+        data=[
+            go.Bar(name=metric, x=matrix.index, y=matrix[metric], marker_color=color)
+            for metric, color in colors.items()
+        ],
+        layout=chart_layout(
+            'Subject Metrics by Student',
+            barmode='group',
+            xaxis_title_text='Student',
+            yaxis_title_text='Percentage',
+            height=450
+        )
+    )
+
+def draw_comparison_heatmap(matrix):
+    """Every metric for every student. Colors are scaled per metric; cells show the values."""
+    spread = (matrix.max() - matrix.min()).replace(0, np.nan)
+    scaled = ((matrix - matrix.min()) / spread).fillna(0.5).where(matrix.notna())
+    return go.Figure(
+        data=[go.Heatmap(
+            z=scaled.to_numpy(),
+            x=list(matrix.columns),
+            y=list(matrix.index),
+            text=matrix.round(1).astype(object).where(matrix.notna(), '').to_numpy(),
+            texttemplate='%{text}',
+            hovertemplate='%{y}<br>%{x}: %{text}<extra></extra>',
+            colorscale=CHART_COLORSCALE,
+            showscale=False
+        )],
+        layout=chart_layout(
+            'Metric Heatmap',
+            yaxis=dict(CHART_AXIS, autorange='reversed'),
+            height=max(300, 60 + 28 * len(matrix))
+        )
+    )
+
+def draw_comparison_parallel(matrix):
+    """Parallel coordinates: one line per student across the metrics every selected student has."""
+    complete = [column for column in matrix.columns if matrix[column].notna().all()]
+    return go.Figure(
+        data=[go.Parcoords(
+            line=dict(color=np.arange(len(matrix)), colorscale=CHART_COLORSCALE),
+            dimensions=[dict(label=column, values=matrix[column]) for column in complete],
+            labelfont=CHART_FONT,
+            tickfont=CHART_TICK_FONT
+        )],
+        layout=chart_layout('Metric Profiles', margin=dict(t=80, b=30, l=60, r=60))
+    )
+
+# Consolidated comparison charts, by kind
+COMPARISON_CHARTS = {
+    'bars': draw_comparison_bars,
+    'heatmap': draw_comparison_heatmap,
+    'parallel': draw_comparison_parallel
+}
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_SIZE)
+def get_comparison_figure(_df, dataset_version, student_ids, kind):
+    """A COMPARISON_CHARTS chart of the students (a tuple of IDs), built once per version and selection."""
+    return COMPARISON_CHARTS[kind](get_comparison_matrix(_df, dataset_version, student_ids))
+
+# Axes of the cohort view: per-subject metrics and the subject's latest
+# diagnostic levels, with their labels
+COHORT_METRICS = {
+    'questions': 'Questions Answered',
+    'skills_practiced': 'Skills Practiced',
+    'skills_mastered': 'Skills Mastered',
+    'progress': 'Progress',
+    'mastery_rate': 'Mastery Rate',
+    'efficiency': 'Efficiency',
+    'predicted_growth': 'Predicted Growth',
+    'starting_level': 'Starting Diagnostic Level',
+    'ending_level': 'Ending Diagnostic Level'
+}
+
+# Bins per axis for the server-side histogram and density charts
+COHORT_BINS = 50
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_cohort_points(_df, dataset_version):
+    """One point per (student, subject): the cohort subject metrics plus the student's
+    latest starting and ending diagnostic levels in that subject (NaN when it has none)."""
+    points = get_cohort_summary(_df, dataset_version)['subjects'].reset_index()
+    levels = get_diagnostic_levels(_df, dataset_version)
+    points['starting_level'] = np.nan
+    points['ending_level'] = np.nan
+    for subject, (_, diagnostics) in SUBJECT_SOURCES.items():
+        rows = (points['subject'] == subject).to_numpy()
+        for column in diagnostics:
+            if column in DIAGNOSTIC_LEVEL_COLUMNS:
+                target = 'starting_level' if column.startswith('Starting') else 'ending_level'
+                points.loc[rows, target] = levels[column].reindex(points['student_id'][rows]).to_numpy()
+    return points
+
+def cohort_subjects(points):
+    """Subjects present in the points, in SUBJECT_SOURCES order."""
+    present = set(points['subject'])
+    return [subject for subject in SUBJECT_SOURCES if subject in present]
+
+# Above this many points the scatter draws a fixed random sample of them; the
+# distribution and density charts always count every point
+COHORT_SCATTER_MAX_POINTS = 50000
+
+def draw_cohort_scatter(points, x, y):
+    """Cohort points on WebGL markers, one trace per subject (a sample when there are too many)."""
+    points = points[points[x].notna() & points[y].notna()]
+    title = f"{COHORT_METRICS[y]} vs {COHORT_METRICS[x]}"
+    if len(points) > COHORT_SCATTER_MAX_POINTS:
+        title += f" (sample of {COHORT_SCATTER_MAX_POINTS:,} of {len(points):,} points)"
+        points = points.sample(n=COHORT_SCATTER_MAX_POINTS, random_state=0).sort_index()
+    data = []
+    for subject in cohort_subjects(points):
+        rows = points[points['subject'] == subject]
+        data.append(go.Scattergl(
+            name=subject,
+            x=rows[x].to_numpy(),
+            y=rows[y].to_numpy(),
+            customdata=rows['student_id'].to_numpy(),
+            mode='markers',
+            marker=dict(size=5, opacity=0.6),
+            hovertemplate=f"Student %{{customdata}}<br>{COHORT_METRICS[x]}: %{{x}}<br>{COHORT_METRICS[y]}: %{{y}}<extra>{subject}</extra>"
+        ))
+    return go.Figure(
+        data=data,
+        layout=chart_layout(
+            title,
+            xaxis_title_text=COHORT_METRICS[x],
+            yaxis_title_text=COHORT_METRICS[y],
+            height=550
+        )
     )
-    
-    return fig
 
-def get_percentile(series, value):
-    """Calculate percentile for a given value in a series."""
+def draw_cohort_histogram(points, x, y):
+    """Distribution of the x metric, binned here and stacked by subject (y is not used)."""
+    values = points[x].to_numpy(dtype='float64')
+    known = ~np.isnan(values)
+    edges = np.histogram_bin_edges(values[known], bins=COHORT_BINS) if known.any() else np.arange(2)
+    data = []
+    for subject in cohort_subjects(points):
+        rows = known & (points['subject'] == subject).to_numpy()
+        if not rows.any():
+            continue
+        counts, _ = np.histogram(values[rows], bins=edges)
+        data.append(go.Bar(
+            name=subject,
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            hovertemplate=f"{COHORT_METRICS[x]}: %{{x}}<br>Students: %{{y}}<extra>{subject}</extra>"
+        ))
+    return go.Figure(
+        data=data,
+        layout=chart_layout(
+            f"Distribution of {COHORT_METRICS[x]}",
+            barmode='stack',
+            bargap=0,
+            xaxis_title_text=COHORT_METRICS[x],
+            yaxis_title_text='Students',
+            height=450
+        )
+    )
+
+def draw_cohort_density(points, x, y):
+    """Point density of y against x, counted here on a COHORT_BINS x COHORT_BINS grid."""
+    rows = points[points[x].notna() & points[y].notna()]
+    if rows.empty:
+        counts, x_edges, y_edges = np.zeros((1, 1)), np.arange(2), np.arange(2)
+    else:
+        counts, x_edges, y_edges = np.histogram2d(
+            rows[x].to_numpy(dtype='float64'), rows[y].to_numpy(dtype='float64'), bins=COHORT_BINS
+        )
+    return go.Figure(
+        data=[go.Heatmap(
+            # histogram2d counts are indexed [x, y]; empty cells are left blank
+            z=np.where(counts > 0, counts, np.nan).T,
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=(y_edges[:-1] + y_edges[1:]) / 2,
+            colorscale=CHART_COLORSCALE,
+            colorbar=dict(title_text='Points'),
+            hovertemplate=f"{COHORT_METRICS[x]}: %{{x}}<br>{COHORT_METRICS[y]}: %{{y}}<br>Points: %{{z}}<extra></extra>"
+        )],
+        layout=chart_layout(
+            f"Density of {COHORT_METRICS[y]} vs {COHORT_METRICS[x]}",
+            xaxis_title_text=COHORT_METRICS[x],
+            yaxis_title_text=COHORT_METRICS[y],
+            height=550
+        )
+    )
+
+# Cohort charts, by kind
+COHORT_CHARTS = {
+    'scatter': draw_cohort_scatter,
+    'distribution': draw_cohort_histogram,
+    'density': draw_cohort_density
+}
+
+# Scatter figures hold every point of the cohort, so fewer of them are kept
+COHORT_FIGURE_CACHE_SIZE = 16
+
+@st.cache_resource(show_spinner=False, max_entries=COHORT_FIGURE_CACHE_SIZE)
+def get_cohort_figure(_df, dataset_version, kind, x, y, subject=None):
+    """A COHORT_CHARTS chart of the whole cohort (or one subject), built once per version and axes."""
+    points = get_cohort_points(_df, dataset_version)
+    if subject is not None:
+        points = points[points['subject'] == subject]
+    return COHORT_CHARTS[kind](points, x, y)
+
+# Cells of the class cube and their additive measures: summed counts, and the
+# sum and number of recorded diagnostic growth values so averages roll up exactly
+CUBE_KEYS = ['teacher_name', 'subject', 'date']
+CUBE_MEASURES = ['row_count', 'questions_answered', 'skills_practiced', 'skills_proficient', 'skills_mastered',
+                 'growth_sum', 'growth_count']
+DIAGNOSTIC_GROWTH_COLUMNS = ['Diagnostic growth - Math', 'Diagnostic growth - ELA']
+
+def aggregate_class_cube(rows):
+    """CUBE_MEASURES per (teacher, subject, date) of a long-format frame; missing keys form their own cells."""
+    # Growth columns only hold values on their own subject's rows
+    growth_columns = [column for column in DIAGNOSTIC_GROWTH_COLUMNS if column in rows.columns]
+    growth = rows[growth_columns].sum(axis=1, min_count=1) if growth_columns else pd.Series(np.nan, index=rows.index)
+    cells = pd.DataFrame({
+        'teacher_name': rows['teacher_name'].astype(object),
+        'subject': rows['subject'].astype(object),
+        'date': rows['date'],
+        'row_count': 1,
+        **{column: rows[column].astype('int64') for column in COUNT_COLUMNS},
+        'growth_sum': growth.fillna(0).astype('float64'),
+        'growth_count': growth.notna().astype('int64')
+    })
+    return cells.groupby(CUBE_KEYS, dropna=False).sum()
+
+def finish_class_cube(cells):
+    """Cube cells sorted by key, with the Term and month of each date as columns for roll-ups."""
+    cells = cells.sort_index()
+    dates = pd.DatetimeIndex(cells.index.get_level_values('date'))
+    terms = assign_terms(dates)
+    cells['Term'] = np.where(pd.isna(terms), 'Unknown', terms)
+    cells['month'] = np.where(dates.isna(), 'Unknown', dates.strftime('%Y-%m'))
+    return cells
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_class_cube(_df, dataset_version):
+    """CUBE_MEASURES for every (teacher, subject, date), computed once per dataset version.
+
+    An incremental ingest adds the cells of the new rows to the parent's cube.
+    """
+    step = get_ingest_step(dataset_version)
+    if step is not None:
+        parent = get_class_cube(step['parent_df'], step['parent'])[CUBE_MEASURES]
+        cells = pd.concat([parent, aggregate_class_cube(step['rows'])]).groupby(level=CUBE_KEYS, dropna=False).sum()
+    elif get_database(_df):
+        growth_columns = [quote_column(column) for column in DIAGNOSTIC_GROWTH_COLUMNS if column in _df['columns']]
+        growth = f"COALESCE({', '.join(growth_columns)}, NULL)" if growth_columns else 'NULL'
+        cells = restore_rows(query_database(_df, f"""
+            SELECT teacher_name, subject, date, COUNT(*) AS row_count,
+                   {', '.join(f'SUM({column}) AS {column}' for column in COUNT_COLUMNS)},
+                   TOTAL({growth}) AS growth_sum, COUNT({growth}) AS growth_count
+            FROM rows GROUP BY teacher_name, subject, date
+        """)).set_index(CUBE_KEYS)
+    else:
+        cells = aggregate_class_cube(_df)
+    return finish_class_cube(cells)
+
+def roll_up_class_cube(cube, by, **filters):
+    """Measures of the cube cells matching column=value filters ("All" or None: no filter), summed per the columns in by.
+
+    Adds mastery rate and average diagnostic growth. Only cube cells are
+    touched, never rows, so any drill-down or roll-up costs the same.
+    """
+    cells = cube.reset_index()
+    for column, value in filters.items():
+        if value is not None and value != "All":
+            cells = cells[cells[column] == value]
+    if by:
+        table = cells.groupby(by, sort=True)[CUBE_MEASURES].sum()
+    else:
+        table = cells[CUBE_MEASURES].sum().to_frame().T.astype(cube[CUBE_MEASURES].dtypes)
+    practiced = table['skills_practiced'].to_numpy(dtype='float64')
+    table['mastery_rate'] = np.round(table['skills_mastered'] / np.maximum(1, practiced) * 100, 1)
+    table['average_growth'] = np.round(table['growth_sum'] / table['growth_count'].replace(0, np.nan), 1)
+    return table
+
+# Columns of the class tables, with their labels
+CLASS_TABLE_COLUMNS = {
+    'questions_answered': 'Questions Answered',
+    'skills_practiced': 'Skills Practiced',
+    'skills_proficient': 'Skills Proficient',
+    'skills_mastered': 'Skills Mastered',
+    'mastery_rate': 'Mastery Rate',
+    'average_growth': 'Avg Diagnostic Growth'
+}
+
+def draw_class_trend(table):
+    """Questions answered and skills mastered per month (bars), with the mastery rate (line)."""
+    return go.Figure(
+        data=[
+            go.Bar(name='Questions Answered', x=table.index, y=table['questions_answered'], marker_color='#7ba7c2'),
+            go.Bar(name='Skills Mastered', x=table.index, y=table['skills_mastered'], marker_color='#9bc995'),
+            go.Scatter(name='Mastery Rate', x=table.index, y=table['mastery_rate'], yaxis='y2',
+                       mode='lines+markers', line=dict(color='#d1b280', width=3))
+        ],
+        layout=chart_layout(
+            'Monthly Activity',
+            barmode='group',
+            xaxis=dict(CHART_AXIS, type='category'),
+            xaxis_title_text='Month',
+            yaxis_title_text='Count',
+            yaxis2=dict(CHART_AXIS, title_text='Mastery Rate (%)', overlaying='y', side='right', range=[0, 100]),
+            height=450
+        )
+    )
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_SIZE)
+def get_class_figure(_df, dataset_version, teacher, subject, term):
+    """Monthly trend of a class, rolled up from the cube once per version and selection."""
+    cube = get_class_cube(_df, dataset_version)
+    return draw_class_trend(roll_up_class_cube(cube, ['month'], teacher_name=teacher, subject=subject, Term=term))
+
+# Diagnostic columns shown as term percentiles
+PERCENTILE_COLUMNS = [
+    'Starting diagnostic level - Math',
+    'Ending diagnostic level - Math',
+    'Starting diagnostic level - ELA',
+    'Ending diagnostic level - ELA'
+]
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_percentile_tables(_df, dataset_version):
+    """Sorted non-missing diagnostic values per (term, column)."""
+    step = get_ingest_step(dataset_version)
+    if step is not None:
+        return extend_percentile_tables(get_percentile_tables(step['parent_df'], step['parent']), step['rows'])
+    return extend_percentile_tables({}, _df)
+
+def extend_percentile_tables(tables, rows):
+    """Copy of tables with the diagnostic values of rows merged in, every array kept sorted."""
+    tables = dict(tables)
+    for term, term_data in rows.groupby('Term', observed=True):
+        for column in PERCENTILE_COLUMNS:
+            if column in term_data.columns:
+                values = term_data[column].to_numpy(dtype='float64')
+                values = np.sort(values[~np.isnan(values)])
+                current = tables.get((term, column), values[:0])
+                tables[(term, column)] = np.insert(current, np.searchsorted(current, values), values)
+    return tables
+
+def get_percentile(df, dataset_version, term, column, value):
+    """Percentile of a value among all of a term's values in a diagnostic column.
+
+    Same result as series.rank(pct=True): tied values share their average rank.
+    """
     if pd.isna(value): return None
-    return round(series.rank(pct=True)[series.index[series == value][0]] * 100)
+    if get_database(df):
+        return get_database_percentile(df, term, column, value)
+    values = get_percentile_tables(df, dataset_version).get((term, column))
+    if values is None:
+        return None
+    below = np.searchsorted(values, value, side='left')
+    through = np.searchsorted(values, value, side='right')
+    if through == below:
+        return None
+    average_rank = (below + 1 + through) / 2
+    return round((average_rank / len(values)) * 100)
 
-def display_ixl_progress(student_id, df):
+def get_database_percentile(df, term, column, value):
+    """get_percentile for a database handle, counted on the (Term, column) index."""
+    if column not in df['columns']:
+        return None
+    column = quote_column(column)
+    counts = query_database(df, f"""
+        SELECT SUM({column} < ?), SUM({column} <= ?), COUNT({column}) FROM rows WHERE Term = ?
+    """, [float(value), float(value), term])
+    below, through, total = np.nan_to_num(counts.iloc[0].to_numpy(dtype='float64'))
+    if through == below:
+        return None
+    average_rank = (below + 1 + through) / 2
+    return round((average_rank / total) * 100)
+
+def display_ixl_progress(student_id, df, dataset_version):
     """Display IXL progress charts for a specific student."""
     st.markdown("### IXL Progress")
     
     # Filter data for the specific student
-    student_data = df[df['student_id'] == student_id].copy()
+    student_data = with_end_date(get_student_rows(df, dataset_version, student_id))
     
     if student_data.empty:
         st.warning("No IXL data available for this student.")
@@ -948,154 +1913,24 @@ def display_ixl_progress(student_id, df):
         
         with col1:
             # Math Progress Chart
-            fig_math = go.Figure()
             try:
                 # Check if required columns exist
                 if 'End date' not in student_data.columns or 'Ending diagnostic level - Math' not in student_data.columns:
                     st.warning("Required columns for Math progress visualization are missing.")
                 else:
-                    fig_math.add_trace(go.Bar(
-                        x=student_data['End date'].dt.strftime('%Y-%m-%d'),
-                        y=student_data['Ending diagnostic level - Math'],
-                        name='Math Level',
-                        marker_color='#2196F3',
-                        text=student_data['Ending diagnostic level - Math'],
-                        textposition='outside',
-                        textfont=dict(
-                            color='black',
-                            size=12,
-                            family='Arial'
-                        ),
-                        hovertemplate='Date: %{x}<br>Level: %{y}<extra></extra>'
-                    ))
-                    fig_math.update_layout(
-                        title={
-                            'text': 'Math Diagnostic Level Over Time',
-                            'x': 0.5,
-                            'xanchor': 'center',
-                            'y': 0.95,
-                            'yanchor': 'top',
-                            'font': dict(
-                                color='black',
-                                size=18,
-                                family='Arial'
-                            )
-                        },
-                        xaxis_title='Date',
-                        yaxis_title='Diagnostic Level',
-                        template='plotly_white',
-                        height=400,
-                        font=dict(
-                            color='black',
-                            size=12,
-                            family='Arial'
-                        ),
-                        xaxis=dict(
-                            title_font=dict(
-                                color='black',
-                                size=12,
-                                family='Arial'
-                            ),
-                            tickfont=dict(
-                                color='black',
-                                size=10,
-                                family='Arial'
-                            ),
-                            tickangle=45
-                        ),
-                        yaxis=dict(
-                            title_font=dict(
-                                color='black',
-                                size=12,
-                                family='Arial'
-                            ),
-                            tickfont=dict(
-                                color='black',
-                                size=10,
-                                family='Arial'
-                            )
-                        ),
-                        margin=dict(t=50, b=50, l=50, r=50),
-                        plot_bgcolor='white',
-                        paper_bgcolor='white'
-                    )
+                    fig_math = get_student_figure(df, dataset_version, student_id, 'math_levels')
                     st.plotly_chart(fig_math, use_container_width=True)
             except Exception as e:
                 st.error(f"Error creating Math progress chart: {str(e)}")
         
         with col2:
             # ELA Progress Chart
-            fig_ela = go.Figure()
             try:
                 # Check if required columns exist
                 if 'End date' not in student_data.columns or 'Ending diagnostic level - ELA' not in student_data.columns:
                     st.warning("Required columns for ELA progress visualization are missing.")
                 else:
-                    fig_ela.add_trace(go.Bar(
-                        x=student_data['End date'].dt.strftime('%Y-%m-%d'),
-                        y=student_data['Ending diagnostic level - ELA'],
-                        name='ELA Level',
-                        marker_color='#FFC107',
-                        text=student_data['Ending diagnostic level - ELA'],
-                        textposition='outside',
-                        textfont=dict(
-                            color='black',
-                            size=12,
-                            family='Arial'
-                        ),
-                        hovertemplate='Date: %{x}<br>Level: %{y}<extra></extra>'
-                    ))
-                    fig_ela.update_layout(
-                        title={
-                            'text': 'ELA Diagnostic Level Over Time',
-                            'x': 0.5,
-                            'xanchor': 'center',
-                            'y': 0.95,
-                            'yanchor': 'top',
-                            'font': dict(
-                                color='black',
-                                size=18,
-                                family='Arial'
-                            )
-                        },
-                        xaxis_title='Date',
-                        yaxis_title='Diagnostic Level',
-                        template='plotly_white',
-                        height=400,
-                        font=dict(
-                            color='black',
-                            size=12,
-                            family='Arial'
-                        ),
-                        xaxis=dict(
-                            title_font=dict(
-                                color='black',
-                                size=12,
-                                family='Arial'
-                            ),
-                            tickfont=dict(
-                                color='black',
-                                size=10,
-                                family='Arial'
-                            ),
-                            tickangle=45
-                        ),
-                        yaxis=dict(
-                            title_font=dict(
-                                color='black',
-                                size=12,
-                                family='Arial'
-                            ),
-                            tickfont=dict(
-                                color='black',
-                                size=10,
-                                family='Arial'
-                            )
-                        ),
-                        margin=dict(t=50, b=50, l=50, r=50),
-                        plot_bgcolor='white',
-                        paper_bgcolor='white'
-                    )
+                    fig_ela = get_student_figure(df, dataset_version, student_id, 'ela_levels')
                     st.plotly_chart(fig_ela, use_container_width=True)
             except Exception as e:
                 st.error(f"Error creating ELA progress chart: {str(e)}")
@@ -1107,46 +1942,45 @@ def display_ixl_progress(student_id, df):
         
         if term_data.empty:
             st.warning(f"No data available for {selected_term} term.")
-            st.stop()
-        
-        # Get the most recent diagnostic for this term
-        latest_data = term_data.sort_values(by="End date", ascending=False).iloc[0]
-        
-        # Calculate percentiles
-        math_start_pct = get_percentile(
-            df[df['Term'] == selected_term]['Starting diagnostic level - Math'],
-            latest_data['Starting diagnostic level - Math']
-        )
-        
-        math_end_pct = get_percentile(
-            df[df['Term'] == selected_term]['Ending diagnostic level - Math'],
-            latest_data['Ending diagnostic level - Math']
-        )
-        
-        ela_start_pct = get_percentile(
-            df[df['Term'] == selected_term]['Starting diagnostic level - ELA'],
-            latest_data['Starting diagnostic level - ELA']
-        )
-        
-        ela_end_pct = get_percentile(
-            df[df['Term'] == selected_term]['Ending diagnostic level - ELA'],
-            latest_data['Ending diagnostic level - ELA']
-        )
-        
-        # Create two columns for the donut charts
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if math_start_pct is not None and math_end_pct is not None:
-                st.plotly_chart(draw_donut_chart("Math", math_start_pct, math_end_pct, selected_term), use_container_width=True)
-            else:
-                st.info("Student Has Not Completed Enough Math Training-Sets To Receive a Score")
-        
-        with col2:
-            if ela_start_pct is not None and ela_end_pct is not None:
-                st.plotly_chart(draw_donut_chart("ELA", ela_start_pct, ela_end_pct, selected_term), use_container_width=True)
-            else:
-                st.info("Student Has Not Completed Enough ELA Training-Sets To Receive a Score")
+        else:
+            # Get the most recent diagnostic for this term
+            latest_data = term_data.sort_values(by="End date", ascending=False).iloc[0]
+            
+            # Calculate percentiles
+            math_start_pct = get_percentile(
+                df, dataset_version, selected_term, 'Starting diagnostic level - Math',
+                latest_data['Starting diagnostic level - Math']
+            )
+            
+            math_end_pct = get_percentile(
+                df, dataset_version, selected_term, 'Ending diagnostic level - Math',
+                latest_data['Ending diagnostic level - Math']
+            )
+            
+            ela_start_pct = get_percentile(
+                df, dataset_version, selected_term, 'Starting diagnostic level - ELA',
+                latest_data['Starting diagnostic level - ELA']
+            )
+            
+            ela_end_pct = get_percentile(
+                df, dataset_version, selected_term, 'Ending diagnostic level - ELA',
+                latest_data['Ending diagnostic level - ELA']
+            )
+            
+            # Create two columns for the donut charts
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                if math_start_pct is not None and math_end_pct is not None:
+                    st.plotly_chart(draw_donut_chart("Math", math_start_pct, math_end_pct, selected_term), use_container_width=True)
+                else:
+                    st.info("Student Has Not Completed Enough Math Training-Sets To Receive a Score")
+            
+            with col2:
+                if ela_start_pct is not None and ela_end_pct is not None:
+                    st.plotly_chart(draw_donut_chart("ELA", ela_start_pct, ela_end_pct, selected_term), use_container_width=True)
+                else:
+                    st.info("Student Has Not Completed Enough ELA Training-Sets To Receive a Score")
     
     # Display additional metrics
     st.markdown("### IXL Metrics")
@@ -1188,18 +2022,18 @@ def display_ixl_progress(student_id, df):
         except Exception as e:
             st.warning("Could not calculate math level change")
 
-def display_student_dashboard(student_id, date_filter=None):
-    student_data = df[df['student_id'] == student_id]
+def display_student_dashboard(student_id, df, dataset_version, date_filter=None):
+    student_data = get_student_rows(df, dataset_version, student_id)
     
     # Apply date filter if specified
     if date_filter and date_filter != "All":
         try:
             filter_date = pd.to_datetime(date_filter)
-            student_data = student_data[student_data['date'].dt.date == filter_date.date()]
+            student_data = student_data[student_data['date'].dt.normalize() == filter_date.normalize()]
         except:
             st.warning("Invalid date format. Showing all data.")
     
-    summary = get_student_summary(df, student_id, date_filter)
+    summary = get_student_summary(df, dataset_version, student_id, date_filter)
     
     if summary is None:
         st.warning("No data available for the selected date.")
@@ -1217,90 +2051,7 @@ def display_student_dashboard(student_id, date_filter=None):
     # Timeline Chart
     st.markdown('<div class="timeline-chart">', unsafe_allow_html=True)
     st.subheader("Progress Timeline")
-    timeline_df = pd.DataFrame(summary['timeline_data'])
-    timeline_df['date'] = pd.to_datetime(timeline_df['date'])
-    
-    # Create a more detailed timeline chart
-    fig = go.Figure()
-    
-    for subject in timeline_df['subject'].unique():
-        subject_data = timeline_df[timeline_df['subject'] == subject]
-        fig.add_trace(go.Scatter(
-            x=subject_data['date'],
-            y=subject_data['skills_mastered'],
-            name=f'{subject} Skills Mastered',
-            mode='lines+markers',
-            line=dict(width=2),
-            marker=dict(size=8)
-        ))
-    
-    fig.update_layout(
-        title={
-            'text': 'Progress Over Time',
-            'x': 0.5,
-            'xanchor': 'center',
-            'y': 0.95,
-            'yanchor': 'top',
-            'font': dict(
-                color='black',
-                size=18,
-                family='Arial'
-            )
-        },
-        xaxis_title='Date',
-        yaxis_title='Skills Mastered',
-        hovermode='x unified',
-        showlegend=True,
-        legend=dict(
-            yanchor="top",
-            y=-0.15,
-            xanchor="center",
-            x=0.5,
-            bgcolor='rgba(255, 255, 255, 0.8)',
-            bordercolor='rgba(0, 0, 0, 0.1)',
-            borderwidth=1,
-            font=dict(
-                color='black',
-                size=12,
-                family='Arial'
-            ),
-            orientation='h'
-        ),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        font=dict(
-            color='black',
-            size=12,
-            family='Arial'
-        ),
-        xaxis=dict(
-            title_font=dict(
-                color='black',
-                size=12,
-                family='Arial'
-            ),
-            tickfont=dict(
-                color='black',
-                size=10,
-                family='Arial'
-            )
-        ),
-        yaxis=dict(
-            title_font=dict(
-                color='black',
-                size=12,
-                family='Arial'
-            ),
-            tickfont=dict(
-                color='black',
-                size=10,
-                family='Arial'
-            )
-        ),
-        margin=dict(t=50, b=100, l=50, r=50)
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(get_student_figure(df, dataset_version, student_id, 'timeline', date_filter), use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Overall Progress
@@ -1319,67 +2070,7 @@ def display_student_dashboard(student_id, date_filter=None):
     
     # Subject Comparison Chart
     st.subheader("Subject Comparison")
-    subjects = list(summary['subject_breakdown'].keys())
-    progress_values = [data['progress'] for data in summary['subject_breakdown'].values()]
-    mastery_rates = [data['mastery_rate'] for data in summary['subject_breakdown'].values()]
-    efficiency_scores = [data['efficiency'] for data in summary['subject_breakdown'].values()]
-    
-    fig = go.Figure(data=[
-        go.Bar(name='Progress', x=subjects, y=progress_values, marker_color='#7ba7c2'),
-        go.Bar(name='Mastery Rate', x=subjects, y=mastery_rates, marker_color='#5d8aa8'),
-        go.Bar(name='Efficiency', x=subjects, y=efficiency_scores, marker_color='#d1b280')
-    ])
-    
-    fig.update_layout(
-        barmode='group',
-        title={
-            'text': 'Subject Performance Comparison',
-            'x': 0.5,
-            'xanchor': 'center',
-            'y': 0.95,
-            'yanchor': 'top',
-            'font': dict(
-                color='black',
-                size=18,
-                family='Arial'
-            )
-        },
-        xaxis_title='Subject',
-        yaxis_title='Percentage',
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        font=dict(
-            color='black',
-            size=12,
-            family='Arial'
-        ),
-        xaxis=dict(
-            title_font=dict(
-                color='black',
-                size=12,
-                family='Arial'
-            ),
-            tickfont=dict(
-                color='black',
-                size=10,
-                family='Arial'
-            )
-        ),
-        yaxis=dict(
-            title_font=dict(
-                color='black',
-                size=12,
-                family='Arial'
-            ),
-            tickfont=dict(
-                color='black',
-                size=10,
-                family='Arial'
-            )
-        )
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(get_student_figure(df, dataset_version, student_id, 'subjects', date_filter), use_container_width=True)
     
     # Subject Breakdown
     st.subheader("Subject Breakdown")
@@ -1511,45 +2202,117 @@ def display_student_dashboard(student_id, date_filter=None):
         st.markdown('</div>', unsafe_allow_html=True)
     
     # Add IXL Progress section after other metrics
-    display_ixl_progress(student_id, df)
-
-def get_student_status_indicators(student_id, df):
-    student_data = df[df['student_id'] == student_id]
-    if student_data.empty:
-        return None
-    
-    # Calculate overall progress
-    total_skills_practiced = student_data['skills_practiced'].sum()
-    total_skills_mastered = student_data['skills_mastered'].sum()
-    overall_progress = round((total_skills_mastered / max(1, total_skills_practiced)) * 100)
-    
-    # Get latest activity date
-    latest_date = student_data['date'].max()
-    days_since_activity = (pd.Timestamp.now() - latest_date).days
-    
-    # Calculate subject completion
-    subjects = student_data['subject'].unique()
-    total_subjects = len(df['subject'].unique())
-    subject_completion = len(subjects) / total_subjects * 100
-    
-    # Calculate growth trend
-    growth_trend = 0
-    for subject in subjects:
-        subject_data = student_data[student_data['subject'] == subject]
-        if not subject_data.empty:
-            mastery_rate = round((subject_data['skills_mastered'].sum() / max(1, subject_data['skills_practiced'].sum())) * 100, 1)
-            efficiency = round((subject_data['skills_mastered'].sum() / max(1, subject_data['questions_answered'].sum())) * 100, 1)
-            growth_trend += (mastery_rate * 0.6 + efficiency * 0.4)
-    growth_trend = round(growth_trend / len(subjects))
-    
+    display_ixl_progress(student_id, df, dataset_version)
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_student_list(_df, dataset_version):
+    """One row per student for the Student List: names, teacher and latest activity."""
+    students = get_student_directory(_df, dataset_version)['table'][['first_name', 'last_name', 'teacher_name']]
+    return students.assign(date=get_roster_base(_df, dataset_version)['latest_date']).reset_index()
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_roster_base(_df, dataset_version):
+    """Date-independent status columns for every student, one row per student."""
+    subjects = get_cohort_summary(_df, dataset_version)['subjects']
+    per_student = subjects.groupby(level='student_id', sort=False)
+    
+    roster = per_student[['skills_practiced', 'skills_mastered']].sum()
+    roster['overall_progress'] = round_like_loop(
+        (roster['skills_mastered'] / np.maximum(1, roster['skills_practiced'])) * 100
+    ).astype('int64')
+    step = get_ingest_step(dataset_version)
+    if step is not None:
+        parent_latest = get_roster_base(step['parent_df'], step['parent'])['latest_date']
+        added_latest = step['rows'].groupby('student_id')['date'].max()
+        roster['latest_date'] = pd.concat([parent_latest, added_latest]).groupby(level=0).max()
+    elif get_database(_df):
+        latest = query_database(_df, "SELECT student_id, MAX(date) AS latest_date FROM rows GROUP BY student_id")
+        roster['latest_date'] = restore_rows(latest.rename(columns={'latest_date': 'date'})).set_index('student_id')['date']
+    else:
+        by_student = get_student_index(_df, dataset_version)['frame']
+        roster['latest_date'] = by_student.groupby('student_id', sort=False)['date'].max()
+    roster['subject_count'] = per_student.size()
+    if get_database(_df):
+        subject_total = query_database(_df, "SELECT COUNT(DISTINCT subject) AS subjects FROM rows")['subjects'].iloc[0]
+    else:
+        subject_total = _df['subject'].nunique()
+    roster['subject_completion'] = roster['subject_count'] / subject_total * 100
+    
+    # Growth trend: mean of (60% mastery rate + 40% efficiency) over the student's
+    # subjects, added up subject by subject like the original running total
+    codes = pd.factorize(subjects.index.get_level_values('student_id'))[0]
+    position = per_student.cumcount().to_numpy()
+    terms = np.zeros((len(roster), position.max(initial=-1) + 1))
+    terms[codes, position] = subjects['mastery_rate'].to_numpy() * 0.6 + subjects['efficiency'].to_numpy() * 0.4
+    growth_total = np.zeros(len(roster))
+    for column in terms.T:
+        growth_total = growth_total + column
+    roster['growth_trend'] = round_like_loop(growth_total / roster['subject_count'].to_numpy()).astype('int64')
+    
+    return roster.drop(columns=['skills_practiced', 'skills_mastered'])
+
+def get_roster_status(df, dataset_version, student_ids=None):
+    """Status indicators and alert flags for the roster (or some students), indexed by student_id.
+
+    Activity depends on the current time, so it is derived from the cached base
+    table on every call (a few column operations).
+    """
+    roster = get_roster_base(df, dataset_version)
+    if student_ids is None:
+        roster = roster.copy()
+    else:
+        roster = roster.loc[roster.index.intersection(student_ids, sort=False)]
+    roster['days_since_activity'] = (pd.Timestamp.now() - roster['latest_date']).dt.days
+    flags = evaluate_alert_flags(roster)
+    roster = roster.join(flags)
+    roster['alert_count'] = flags.sum(axis=1)
+    roster['at_risk'] = flags[[name for name, alert in STUDENT_ALERTS.items() if alert[0] == 'danger']].any(axis=1)
+    return roster
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_at_risk_table(_df, dataset_version, today):
+    """At-risk students with their status columns and alert messages, for the cards filter and exports.
+
+    Activity alerts move with the date, so the table is cached per version and day.
+    """
+    roster = get_roster_status(_df, dataset_version)
+    at_risk = roster[roster['at_risk']]
+    table = get_student_directory(_df, dataset_version)['table'].reindex(at_risk.index)
+    return pd.DataFrame({
+        'student_name': table['name'],
+        'teacher': table['teacher_name'],
+        'overall_progress': at_risk['overall_progress'],
+        'days_since_activity': at_risk['days_since_activity'],
+        'subject_completion': at_risk['subject_completion'].round(1),
+        'growth_trend': at_risk['growth_trend'],
+        'alerts': [
+            '; '.join(alert['message'] for alert in get_student_alerts(status))
+            for status in at_risk[list(STUDENT_ALERTS)].to_dict('records')
+        ]
+    }, index=at_risk.index).sort_values(['days_since_activity', 'overall_progress'], ascending=[False, True])
+
+def get_report_record(summary):
+    """Report row for one student summary."""
     return {
-        'overall_progress': overall_progress,
-        'days_since_activity': days_since_activity,
-        'subject_completion': subject_completion,
-        'growth_trend': growth_trend,
-        'subjects': list(subjects)
+        'student_name': summary['name'],
+        'teacher': summary['teacher'],
+        'total_questions': summary['total_questions'],
+        'total_skills_practiced': summary['total_skills_practiced'],
+        'total_skills_mastered': summary['total_skills_mastered'],
+        'latest_date': summary['latest_date'].strftime('%Y-%m-%d') if pd.notnull(summary['latest_date']) else 'Unknown'
     }
 
+@st.cache_data(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def build_at_risk_report(_df, dataset_version, today):
+    """CSV of the at-risk table, generated on request and cached per dataset version and day."""
+    return get_at_risk_table(_df, dataset_version, today).rename_axis('student_id').reset_index().to_csv(index=False)
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def build_student_report(_df, student_id, dataset_version):
+    """CSV report for one student, generated on request and cached per dataset version."""
+    summary = get_student_summary(_df, dataset_version, student_id)
+    return pd.DataFrame([get_report_record(summary)]).to_csv(index=False)
+
 def get_status_icon(progress):
     if progress >= 80: return '<i class="fas fa-star" style="color: #f1c40f;"></i>'
     if progress >= 60: return '<i class="fas fa-star-half-alt" style="color: #f1c40f;"></i>'
@@ -1575,189 +2338,894 @@ def get_growth_indicator(trend):
         return '<i class="fas fa-equals" style="color: #f1c40f;"></i>', 'Stable', 'status-warning'
     return '<i class="fas fa-arrow-down" style="color: #e74c3c;"></i>', 'Needs Attention', 'status-alert'
 
+# Alert flag -> (type, icon, message), in display order
+STUDENT_ALERTS = {
+    'inactive': ('danger', '<i class="fas fa-exclamation-circle"></i>', 'No activity in the last 7 days'),
+    'limited_activity': ('warning', '<i class="fas fa-clock"></i>', 'Limited activity this week'),
+    'progress_below_target': ('danger', '<i class="fas fa-chart-line"></i>', 'Overall progress below target'),
+    'progress_needs_improvement': ('warning', '<i class="fas fa-chart-line"></i>', 'Progress needs improvement'),
+    'low_participation': ('warning', '<i class="fas fa-book"></i>', 'Low subject participation'),
+    'growth_declining': ('danger', '<i class="fas fa-arrow-down"></i>', 'Growth trend declining')
+}
+
+def evaluate_alert_flags(status):
+    """Evaluate the alert rules as column masks over a status table."""
+    days = status['days_since_activity']
+    progress = status['overall_progress']
+    return pd.DataFrame({
+        # Activity alerts
+        'inactive': days > 7,
+        'limited_activity': (days > 3) & (days <= 7),
+        # Progress alerts
+        'progress_below_target': progress < 40,
+        'progress_needs_improvement': (progress >= 40) & (progress < 60),
+        # Subject completion alerts
+        'low_participation': status['subject_completion'] < 50,
+        # Growth alerts
+        'growth_declining': status['growth_trend'] < 40
+    }, index=status.index)
+
 def get_student_alerts(status):
-    alerts = []
-    
-    # Activity alerts
-    if status['days_since_activity'] > 7:
-        alerts.append({
-            'type': 'danger',
-            'icon': '<i class="fas fa-exclamation-circle"></i>',
-            'message': 'No activity in the last 7 days'
-        })
-    elif status['days_since_activity'] > 3:
-        alerts.append({
-            'type': 'warning',
-            'icon': '<i class="fas fa-clock"></i>',
-            'message': 'Limited activity this week'
-        })
-    
-    # Progress alerts
-    if status['overall_progress'] < 40:
-        alerts.append({
-            'type': 'danger',
-            'icon': '<i class="fas fa-chart-line"></i>',
-            'message': 'Overall progress below target'
-        })
-    elif status['overall_progress'] < 60:
-        alerts.append({
-            'type': 'warning',
-            'icon': '<i class="fas fa-chart-line"></i>',
-            'message': 'Progress needs improvement'
-        })
-    
-    # Subject completion alerts
-    if status['subject_completion'] < 50:
-        alerts.append({
-            'type': 'warning',
-            'icon': '<i class="fas fa-book"></i>',
-            'message': 'Low subject participation'
-        })
-    
-    # Growth alerts
-    if status['growth_trend'] < 40:
-        alerts.append({
-            'type': 'danger',
-            'icon': '<i class="fas fa-arrow-down"></i>',
-            'message': 'Growth trend declining'
-        })
-    
-    return alerts
+    """Alerts raised for one row of get_roster_status, in display order."""
+    return [
+        {'type': alert_type, 'icon': icon, 'message': message}
+        for name, (alert_type, icon, message) in STUDENT_ALERTS.items()
+        if status[name]
+    ]
+
+# Student List page sizes
+STUDENT_LIST_PAGE_SIZES = [10, 25, 50, 100]
+DEFAULT_STUDENT_LIST_PAGE_SIZE = 25
 
 # Add debug mode toggle at the top of the app
 debug_mode = st.sidebar.checkbox("Debug Mode", value=False)
 
-# Load and process data
-@st.cache_data
-def load_data():
+# Wide export layout: normalized subject name -> (column prefix in the CSV,
+# diagnostic columns carried over as {normalized name: CSV column})
+SUBJECT_SOURCES = {
+    'Mathematics': ('Math', {
+        'Starting diagnostic level - Math': 'Starting diagnostic level - Math',
+        'Ending diagnostic level - Math': 'Ending diagnostic level - Math',
+        'Diagnostic growth - Math': 'Diagnostic growth - Math'
+    }),
+    'English Language Arts': ('ELA', {
+        'Starting diagnostic level - ELA': 'Starting diagnostic level - Overall ELA',
+        'Ending diagnostic level - ELA': 'Ending diagnostic level - Overall ELA',
+        'Diagnostic growth - ELA': 'Diagnostic growth - ELA'
+    }),
+    'Science': ('Science', {}),
+    'Social Studies': ('Social studies', {})
+}
+
+COUNT_COLUMNS = ['questions_answered', 'skills_practiced', 'skills_proficient', 'skills_mastered']
+
+def parse_end_dates(values):
+    """Parse export dates once per distinct value; unparseable values become NaT."""
+    codes, uniques = pd.factorize(values)
+    parsed = pd.DatetimeIndex(pd.to_datetime(pd.Series(uniques, dtype=object), format='mixed', errors='coerce'))
+    return parsed.take(codes, allow_fill=True, fill_value=pd.NaT)
+
+def assign_terms(dates):
+    """Map dates to terms: August-December is Fall, January-June is Spring."""
+    month = pd.DatetimeIndex(dates).month
+    return np.select(
+        [(month >= 8) & (month <= 12), (month >= 1) & (month <= 6)],
+        ["Fall", "Spring"],
+        default=None
+    )
+
+def normalize_ixl_export(raw):
+    """Reshape the wide IXL export into one row per student per active subject.
+
+    Rows without a student ID and subjects with no questions answered are
+    dropped. Rows come out student by student in export order, subjects in
+    SUBJECT_SOURCES order.
+    """
+    raw = raw[raw['Student ID'].notna()]
+    subjects = list(SUBJECT_SOURCES)
+    prefixes = [prefix for prefix, _ in SUBJECT_SOURCES.values()]
+    
+    # One (rows x subjects) matrix per count column
+    counts = {
+        column: raw[[f"{prefix} {column.replace('_', ' ')}" for prefix in prefixes]].to_numpy(dtype='float64')
+        for column in COUNT_COLUMNS
+    }
+    
+    # Row-major nonzero keeps the original record order: row by row, subject by subject
+    rows, subject_codes = np.nonzero(np.trunc(counts['questions_answered']) > 0)
+    
+    end_dates = parse_end_dates(raw['End date'])[rows]
+    records = {
+        'student_id': raw['Student ID'].to_numpy()[rows],
+        'first_name': raw['Student first name'].to_numpy()[rows],
+        'last_name': raw['Student last name'].to_numpy()[rows],
+        'teacher_name': raw['Teacher names'].to_numpy()[rows],
+        'date': end_dates,
+        'Term': assign_terms(end_dates),
+        'subject': np.array(subjects, dtype=object)[subject_codes]
+    }
+    for column in COUNT_COLUMNS:
+        records[column] = pd.Series(counts[column][rows, subject_codes]).astype('int64').to_numpy()
+    
+    # Diagnostic levels only apply to their own subject's rows
+    for code, (_, diagnostics) in enumerate(SUBJECT_SOURCES.values()):
+        for column, source in diagnostics.items():
+            if source in raw.columns:
+                values = raw[source].to_numpy(dtype='float64')[rows]
+                records[column] = np.where(subject_codes == code, values, np.nan)
+    
+    return compact_frame(pd.DataFrame(records))
+
+# Strings repeated on every subject row of a student
+CATEGORICAL_COLUMNS = ['first_name', 'last_name', 'teacher_name', 'Term', 'subject']
+
+def compact_frame(df):
+    """Shrink the normalized frame without changing any value.
+
+    Repeated strings become categoricals, counts take the smallest integer
+    type that holds them and diagnostic levels drop to float32 when that is
+    lossless. 'End date' is not stored; with_end_date adds it back on demand.
+    """
+    df = df.drop(columns='End date', errors='ignore')
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype('category')
+    for column in COUNT_COLUMNS:
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+    for column in df.columns[df.columns.str.contains('diagnostic', case=False)]:
+        values = df[column].to_numpy(dtype='float64')
+        narrow = values.astype('float32')
+        if np.array_equal(narrow, values, equal_nan=True):
+            df[column] = narrow
+    return df
+
+def with_end_date(frame):
+    """Copy of frame with the export's 'End date' column next to 'date' (the same values)."""
+    frame = frame.copy()
+    frame.insert(frame.columns.get_loc('date') + 1, 'End date', frame['date'])
+    return frame
+
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_memory_report(_df, dataset_version):
+    """Bytes per column of the loaded frame against the uncompacted layout (object strings, 64-bit numbers)."""
+    after = _df.memory_usage(deep=True, index=False)
+    before = pd.Series({
+        column: (
+            _df[column].astype(object).memory_usage(deep=True, index=False)
+            if isinstance(_df[column].dtype, pd.CategoricalDtype)
+            else len(_df) * 8
+        )
+        for column in _df.columns
+    })
+    # 'End date' used to be a second copy of 'date'
+    before['End date'], after['End date'] = len(_df) * 8, 0
+    report = pd.DataFrame({'before': before, 'after': after})
+    report.loc['Total'] = report.sum()
+    return report
+
+# Columns an uploaded export must have; diagnostic columns are optional
+REQUIRED_UPLOAD_COLUMNS = ['Student ID', 'Student first name', 'Student last name', 'Teacher names', 'End date'] + [
+    f"{prefix} {column.replace('_', ' ')}" for prefix, _ in SUBJECT_SOURCES.values() for column in COUNT_COLUMNS
+]
+
+# Export rows parsed at a time, so an upload is never held in memory as raw text
+UPLOAD_CHUNK_ROWS = 50000
+
+# Rows quoted per problem in the issues list
+UPLOAD_ISSUE_EXAMPLES = 5
+
+def check_upload_chunk(chunk, problems):
+    """Validate one chunk of an uploaded export and coerce its columns for normalize_ixl_export.
+
+    Problems are counted in problems as {description: [count, first line numbers]}.
+    Returns the chunk with numeric counts, diagnostics and student IDs.
+    """
+    def report(description, mask):
+        if mask.any():
+            entry = problems.setdefault(description, [0, []])
+            entry[0] += int(mask.sum())
+            # The chunk index runs on across chunks; line 1 is the header
+            lines = mask.index[mask.to_numpy()] + 2
+            entry[1].extend(lines[:UPLOAD_ISSUE_EXAMPLES - len(entry[1])].tolist())
+
+    ids = pd.to_numeric(chunk['Student ID'], errors='coerce')
+    report("'Student ID' is not a number", ids.isna() & chunk['Student ID'].notna())
+    report("'Student ID' is not a whole number", ids.notna() & (ids != np.trunc(ids)))
+    chunk = chunk[ids.notna()]
+    chunk['Student ID'] = ids[ids.notna()].to_numpy(dtype='float64')
+
+    dates = chunk['End date']
+    report("'End date' is not a date", dates.notna() & parse_end_dates(dates).isna())
+
+    # Blank counts mean no activity
+    for prefix, diagnostics in SUBJECT_SOURCES.values():
+        for column in COUNT_COLUMNS:
+            source = f"{prefix} {column.replace('_', ' ')}"
+            values = pd.to_numeric(chunk[source], errors='coerce')
+            report(f"'{source}' is not a number", values.isna() & chunk[source].notna())
+            report(f"'{source}' is negative or fractional", values.notna() & ((values < 0) | (values != np.trunc(values))))
+            chunk[source] = values.fillna(0)
+        for source in diagnostics.values():
+            if source in chunk.columns:
+                values = pd.to_numeric(chunk[source], errors='coerce')
+                report(f"'{source}' is not a number", values.isna() & chunk[source].notna())
+                if not source.startswith('Diagnostic growth'):
+                    report(f"'{source}' is negative", values < 0)
+                chunk[source] = values
+    return chunk
+
+def process_uploaded_csv(uploaded_file):
+    """Validate and normalize an uploaded IXL export; returns (df, issues).
+
+    The header is checked before any rows are read. Rows are then parsed
+    UPLOAD_CHUNK_ROWS at a time, checked and normalized chunk by chunk, so
+    only the normalized result grows with the size of the upload. df is None
+    when there are issues; it has the same layout and row order as the
+    frame load_data builds from the same export.
+    """
     try:
-        df = pd.read_csv('data/combined_data.csv')
-        
-        # Create a list to store processed records
-        records = []
-        
-        for _, row in df.iterrows():
-            student_id = row['Student ID']
-            if pd.isna(student_id):
+        uploaded_file.seek(0)
+        header = pd.read_csv(uploaded_file, nrows=0).columns
+    except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError) as e:
+        return None, [f"Could not read the file as CSV: {e}"]
+    missing = [column for column in REQUIRED_UPLOAD_COLUMNS if column not in header]
+    if missing:
+        return None, [f"Missing required column: '{column}'" for column in missing]
+
+    diagnostics = [source for _, sources in SUBJECT_SOURCES.values() for source in sources.values() if source in header]
+    problems = {}
+    frames = []
+    try:
+        uploaded_file.seek(0)
+        reader = pd.read_csv(
+            uploaded_file, usecols=REQUIRED_UPLOAD_COLUMNS + diagnostics,
+            dtype={'End date': object}, chunksize=UPLOAD_CHUNK_ROWS
+        )
+        for chunk in reader:
+            chunk = check_upload_chunk(chunk, problems)
+            # Keep validating after a problem so every issue is reported, but stop normalizing
+            if problems:
                 continue
-                
-            # Convert date to datetime
-            try:
-                end_date = pd.to_datetime(row['End date'])
-            except:
-                end_date = pd.NaT  # Not a Time
-                
-            # Calculate term based on date
-            def get_term(date):
-                if pd.isna(date): return None
-                month = date.month
-                if 8 <= month <= 12: return "Fall"
-                elif 1 <= month <= 6: return "Spring"
-                return None
-            
-            term = get_term(end_date)
-                
-            # Process Math records
-            if not pd.isna(row['Math questions answered']) and int(row['Math questions answered']) > 0:
-                record = {
-                    'student_id': student_id,
-                    'first_name': row['Student first name'],
-                    'last_name': row['Student last name'],
-                    'teacher_name': row['Teacher names'],
-                    'date': end_date,
-                    'End date': end_date,
-                    'Term': term,
-                    'subject': 'Mathematics',
-                    'questions_answered': int(row['Math questions answered']),
-                    'skills_practiced': int(row['Math skills practiced']),
-                    'skills_proficient': int(row['Math skills proficient']),
-                    'skills_mastered': int(row['Math skills mastered'])
-                }
-                
-                # Add diagnostic levels if they exist
-                if 'Starting diagnostic level - Math' in row:
-                    record['Starting diagnostic level - Math'] = row['Starting diagnostic level - Math']
-                if 'Ending diagnostic level - Math' in row:
-                    record['Ending diagnostic level - Math'] = row['Ending diagnostic level - Math']
-                if 'Diagnostic growth - Math' in row:
-                    record['Diagnostic growth - Math'] = row['Diagnostic growth - Math']
-                
-                records.append(record)
-            
-            # Process ELA records
-            if not pd.isna(row['ELA questions answered']) and int(row['ELA questions answered']) > 0:
-                record = {
-                    'student_id': student_id,
-                    'first_name': row['Student first name'],
-                    'last_name': row['Student last name'],
-                    'teacher_name': row['Teacher names'],
-                    'date': end_date,
-                    'End date': end_date,
-                    'Term': term,
-                    'subject': 'English Language Arts',
-                    'questions_answered': int(row['ELA questions answered']),
-                    'skills_practiced': int(row['ELA skills practiced']),
-                    'skills_proficient': int(row['ELA skills proficient']),
-                    'skills_mastered': int(row['ELA skills mastered'])
-                }
-                
-                # Add diagnostic levels if they exist
-                if 'Starting diagnostic level - Overall ELA' in row:
-                    record['Starting diagnostic level - ELA'] = row['Starting diagnostic level - Overall ELA']
-                if 'Ending diagnostic level - Overall ELA' in row:
-                    record['Ending diagnostic level - ELA'] = row['Ending diagnostic level - Overall ELA']
-                if 'Diagnostic growth - ELA' in row:
-                    record['Diagnostic growth - ELA'] = row['Diagnostic growth - ELA']
-                
-                records.append(record)
-            
-            # Process Science records
-            if not pd.isna(row['Science questions answered']) and int(row['Science questions answered']) > 0:
-                records.append({
-                    'student_id': student_id,
-                    'first_name': row['Student first name'],
-                    'last_name': row['Student last name'],
-                    'teacher_name': row['Teacher names'],
-                    'date': end_date,
-                    'End date': end_date,
-                    'Term': term,
-                    'subject': 'Science',
-                    'questions_answered': int(row['Science questions answered']),
-                    'skills_practiced': int(row['Science skills practiced']),
-                    'skills_proficient': int(row['Science skills proficient']),
-                    'skills_mastered': int(row['Science skills mastered'])
-                })
-            
-            # Process Social Studies records
-            if not pd.isna(row['Social studies questions answered']) and int(row['Social studies questions answered']) > 0:
-                records.append({
-                    'student_id': student_id,
-                    'first_name': row['Student first name'],
-                    'last_name': row['Student last name'],
-                    'teacher_name': row['Teacher names'],
-                    'date': end_date,
-                    'End date': end_date,
-                    'Term': term,
-                    'subject': 'Social Studies',
-                    'questions_answered': int(row['Social studies questions answered']),
-                    'skills_practiced': int(row['Social studies skills practiced']),
-                    'skills_proficient': int(row['Social studies skills proficient']),
-                    'skills_mastered': int(row['Social studies skills mastered'])
-                })
-        
-        # Create DataFrame and sort by date
-        df = pd.DataFrame(records)
-        df = df.sort_values('date', ascending=False)
-        
+            chunk['Student ID'] = chunk['Student ID'].astype('int64')
+            frames.append(normalize_ixl_export(chunk))
+    except (pd.errors.ParserError, UnicodeDecodeError, ValueError) as e:
+        return None, [f"Could not read the file as CSV: {e}"]
+
+    issues = [
+        f"{description}: {count} row(s), e.g. line(s) {', '.join(map(str, examples))}"
+        for description, (count, examples) in problems.items()
+    ]
+    if issues:
+        return None, issues
+    if not frames:
+        return None, ["The file contains no rows"]
+    df = concat_normalized(frames)
+    if len(df) == 0:
+        return None, ["No student has any questions answered in the file"]
+    return df.sort_values('date', ascending=False, kind='stable', ignore_index=True), []
+
+DATA_FILE = Path('data/combined_data.csv')
+
+# Bump whenever normalize_ixl_export changes its output so cached files are rebuilt
+NORMALIZED_CACHE_VERSION = 5
+
+def source_fingerprint(path):
+    """Fingerprint a source file by size and modification time (None if it is missing)."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    key = f"{NORMALIZED_CACHE_VERSION}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+# Normalized rows are kept in a folder of Parquet parts next to the source CSV:
+# the first part is a full build, later parts hold rows appended to the export
+# since. A full rebuild folds them back into one part after INGEST_MAX_PARTS.
+INGEST_MAX_PARTS = 16
+
+def ingest_store_path(path):
+    """Folder of the normalized Parquet store, next to the source CSV."""
+    return path.with_name(f".{path.stem}.store")
+
+def source_digest(path, size):
+    """sha256 of the first size bytes of the file, read in blocks.
+
+    New bytes only count as an append when the whole previously ingested
+    prefix is unchanged; an edit anywhere in it means a full rebuild.
+    """
+    digest = hashlib.sha256()
+    remaining = size
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(min(1 << 20, remaining)), b''):
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+def read_store_manifest(store_path):
+    """The store's manifest; None if it is missing, unreadable or from another cache version."""
+    try:
+        manifest = json.loads((store_path / 'manifest.json').read_text())
+    except (OSError, ValueError):
+        return None
+    if manifest.get('cache_version') != NORMALIZED_CACHE_VERSION:
+        return None
+    return manifest
+
+def write_store_file(target, write):
+    """Write a store file through a temporary name so readers never see half of it."""
+    tmp_path = target.with_suffix('.tmp')
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, target)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+def write_store_manifest(store_path, manifest):
+    """Replace the manifest that says which parts make up the store."""
+    write_store_file(store_path / 'manifest.json', lambda target: target.write_text(json.dumps(manifest)))
+
+def write_full_store(path, fingerprint, df):
+    """Replace the store with a single part holding df."""
+    store_path = ingest_store_path(path)
+    try:
+        store_path.mkdir(exist_ok=True)
+        # Without a manifest a crash half-way only means the next load rebuilds
+        (store_path / 'manifest.json').unlink(missing_ok=True)
+        for stale_path in store_path.glob('part-*.parquet'):
+            stale_path.unlink()
+        write_store_file(store_path / 'part-00000.parquet', df.to_parquet)
+        write_store_manifest(store_path, {
+            'cache_version': NORMALIZED_CACHE_VERSION,
+            'fingerprint': fingerprint,
+            'source_size': path.stat().st_size,
+            'source_digest': source_digest(path, path.stat().st_size),
+            'parts': ['part-00000.parquet']
+        })
+    except Exception:
+        # The store is an optimization only (read-only volume, missing pyarrow, ...)
+        return
+    # Single-file caches written by earlier versions of the app
+    for stale_path in path.parent.glob(f".{path.stem}.*.parquet"):
+        stale_path.unlink(missing_ok=True)
+
+def concat_normalized(frames):
+    """Concatenate normalized frames; categoricals get the sorted union of their categories."""
+    frames = list(frames)
+    for column in CATEGORICAL_COLUMNS:
+        categories = frames[0][column].cat.categories
+        for frame in frames[1:]:
+            categories = categories.union(frame[column].cat.categories)
+        frames = [
+            frame if frame[column].cat.categories.equals(categories)
+            else frame.assign(**{column: frame[column].cat.set_categories(categories)})
+            for frame in frames
+        ]
+    return pd.concat(frames, ignore_index=True)
+
+def append_normalized(base, rows):
+    """base (newest first) plus newly normalized rows, in the order a full rebuild gives.
+
+    Also returns whether the rows simply went in front of base, i.e. each of
+    them is newer than everything in base; derived structures can then be
+    extended instead of rebuilt.
+    """
+    rows = rows.sort_values('date', ascending=False, kind='stable')
+    base_latest = base['date'].max()
+    if len(rows) == 0 or (rows['date'].notna().all() and (pd.isna(base_latest) or rows['date'].min() > base_latest)):
+        return concat_normalized([rows, base]), True
+    combined = concat_normalized([base, rows])
+    return combined.sort_values('date', ascending=False, kind='stable', ignore_index=True), False
+
+def read_store(store_path, manifest):
+    """Rebuild the normalized frame from the store's parts."""
+    df = None
+    for name in manifest['parts']:
+        # A column with no values in a part comes back from Parquet as float64
+        part = pd.read_parquet(store_path / name).astype({column: 'category' for column in CATEGORICAL_COLUMNS})
+        df = part if df is None else append_normalized(df, part)[0]
+    return df
+
+def read_appended_rows(path, manifest):
+    """Normalized rows appended to the export since the store was written, with the new file size.
+
+    None if the file was changed in any other way than by appending lines.
+    """
+    size = path.stat().st_size
+    covered = manifest['source_size']
+    if size <= covered or source_digest(path, covered) != manifest['source_digest']:
+        return None
+    with open(path, 'rb') as source:
+        header = source.readline()
+        source.seek(covered - 1)
+        appended = source.read(size - covered + 1)
+    # The previously last line has to end where the appended bytes start
+    if appended[:1] != b'\n' and appended[1:2] not in (b'\n', b'\r'):
+        return None
+    return normalize_ixl_export(pd.read_csv(io.BytesIO(header + appended[1:]))), size
+
+@st.cache_resource
+def get_ingest_log():
+    """The latest incremental ingest, by the dataset version it produced.
+
+    Holds the parent version, its frame and the rows put in front of it, so
+    per-version structures can extend the parent's instead of rebuilding.
+    """
+    return {}
+
+def get_ingest_step(dataset_version):
+    """{'parent', 'parent_df', 'rows'} if dataset_version is its parent with newer rows in front, else None."""
+    return get_ingest_log().get(dataset_version)
+
+def ingest_appended_rows(path, fingerprint, manifest, base, appended):
+    """Add appended export rows to base and to the store, recording the step for derived structures.
+
+    Every appended row is kept, as in a full build, so a version gives the
+    same frame however it was ingested.
+    """
+    rows, size = appended
+    df, prepended = append_normalized(base, rows)
+    
+    log = get_ingest_log()
+    log.clear()
+    if prepended:
+        log[fingerprint] = {'parent': manifest['fingerprint'], 'parent_df': base, 'rows': df.iloc[:len(rows)]}
+    
+    if len(manifest['parts']) >= INGEST_MAX_PARTS:
+        write_full_store(path, fingerprint, df)
         return df
+    store_path = ingest_store_path(path)
+    parts = list(manifest['parts'])
+    try:
+        if len(rows):
+            name = f"part-{len(parts):05d}.parquet"
+            write_store_file(store_path / name, rows.to_parquet)
+            parts.append(name)
+        write_store_manifest(store_path, dict(
+            manifest, fingerprint=fingerprint, source_size=size,
+            source_digest=source_digest(path, size), parts=parts
+        ))
+    except Exception:
+        pass
+    return df
+
+def read_normalized_data(path, fingerprint, previous=None):
+    """Load the normalized frame for this version of the source CSV.
+
+    Served from the Parquet store when it already covers the version. When
+    lines were only appended to the export, just those are parsed and
+    normalized and they go into the store as a new part; any
+    other change rebuilds it. previous is the (version, frame) currently served, used as
+    the base of an append instead of reading the store back.
+    """
+    manifest = read_store_manifest(ingest_store_path(path)) if fingerprint is not None else None
+    if manifest is not None:
+        try:
+            if manifest['fingerprint'] == fingerprint:
+                return read_store(ingest_store_path(path), manifest)
+            appended = read_appended_rows(path, manifest)
+            if appended is not None:
+                if previous is not None and previous[0] == manifest['fingerprint'] and previous[1] is not None:
+                    base = previous[1]
+                else:
+                    base = read_store(ingest_store_path(path), manifest)
+                return ingest_appended_rows(path, fingerprint, manifest, base, appended)
+        except Exception:
+            # A damaged store is rebuilt below
+            pass
+    
+    df = normalize_ixl_export(pd.read_csv(path))
+    df = df.sort_values('date', ascending=False, kind='stable', ignore_index=True)
+    if fingerprint is not None:
+        write_full_store(path, fingerprint, df)
+    return df
+
+# Storage backend for the normalized rows: 'memory' keeps them in a DataFrame
+# shared by all sessions, 'sqlite' in an indexed SQLite file next to the CSV so
+# only per-student tables are held in memory
+STORAGE_BACKEND = os.environ.get('DASHBOARD_BACKEND', 'memory').strip().lower()
+
+# Indexed columns of the SQLite rows table (percentile lookups use the
+# (Term, diagnostic column) indexes)
+DATABASE_INDEXES = [['student_id', 'position'], ['teacher_name'], ['subject'], ['date']]
+
+def quote_column(column):
+    """SQL identifier for a column name (several contain spaces)."""
+    return '"' + column.replace('"', '""') + '"'
+
+def sql_value(value):
+    """Python scalar sqlite3 can bind (numpy scalars are not accepted)."""
+    return value.item() if isinstance(value, np.generic) else value
+
+def get_database(df):
+    """Path of the SQLite file when df is a database handle, else None."""
+    return df['database'] if isinstance(df, dict) else None
+
+def query_database(df, sql, params=()):
+    """Run a query against the dataset's SQLite file and return a DataFrame."""
+    with closing(sqlite3.connect(get_database(df))) as conn:
+        return pd.read_sql_query(sql, conn, params=[sql_value(value) for value in params])
+
+def database_rows(frame, first_position):
+    """Normalized rows as stored in SQLite: 'position' keeps the frame order, dates are epoch seconds."""
+    dates = frame['date']
+    seconds = np.where(dates.isna(), np.nan, dates.to_numpy(dtype='datetime64[s]').astype('int64'))
+    return frame.assign(
+        date=pd.array(seconds, dtype='Int64'),
+        position=np.arange(first_position, first_position + len(frame))
+    )
+
+def restore_rows(rows):
+    """Rows read from SQLite, with their dates converted back from epoch seconds."""
+    if 'date' not in rows.columns:
+        return rows
+    return rows.assign(date=pd.to_datetime(rows['date'], unit='s'))
+
+def write_database(database, df):
+    """Create the rows table from a full normalized frame, plus its indexes."""
+    with closing(sqlite3.connect(database)) as conn:
+        database_rows(df, 0).to_sql('rows', conn, index=False, chunksize=50000)
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(rows)')]
+        indexes = DATABASE_INDEXES + [['Term', column] for column in PERCENTILE_COLUMNS if column in columns]
+        for number, columns in enumerate(indexes):
+            conn.execute(f"CREATE INDEX rows_{number} ON rows ({', '.join(map(quote_column, columns))})")
+        conn.commit()
+
+def prepend_database(database, rows):
+    """Insert rows that go in front of all stored ones (newer than everything else)."""
+    with closing(sqlite3.connect(database)) as conn:
+        first_position = conn.execute('SELECT MIN(position) FROM rows').fetchone()[0] or 0
+        database_rows(rows, first_position - len(rows)).to_sql('rows', conn, index=False, if_exists='append', chunksize=50000)
+        conn.commit()
+
+def read_database_rows(df, limit=None, offset=0, columns=None):
+    """Rows of a database handle in dataset order (newest first); optionally a window of them and some columns."""
+    columns = df['columns'] if columns is None else columns
+    sql = f"SELECT {', '.join(map(quote_column, columns))} FROM rows ORDER BY position"
+    if limit is not None:
+        sql += f" LIMIT {int(limit)} OFFSET {int(offset)}"
+    return restore_rows(query_database(df, sql))
+
+def load_database(path, fingerprint):
+    """Database handle for this version of the source CSV, building its SQLite file if needed.
+
+    Every version gets its own file, so reruns still on the previous version
+    keep reading a complete database. A version that only put newer rows in
+    front of the previous one copies that file and inserts just those rows.
+    """
+    database = path.with_name(f".{path.stem}.{fingerprint}.sqlite")
+    if not database.exists():
+        df = read_normalized_data(path, fingerprint)
+        # The frame is not kept in this mode; neither is its ingest step
+        step = get_ingest_log().pop(fingerprint, None)
+        parent = path.with_name(f".{path.stem}.{step['parent']}.sqlite") if step is not None else None
+        tmp_path = database.with_suffix('.tmp')
+        try:
+            if parent is not None and parent.exists():
+                shutil.copyfile(parent, tmp_path)
+                prepend_database(tmp_path, step['rows'])
+            else:
+                tmp_path.unlink(missing_ok=True)
+                write_database(tmp_path, df)
+            os.replace(tmp_path, database)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        del df, step
+        
+        # Keep the newest older file for reruns that started before this version
+        older = sorted(
+            (other for other in path.parent.glob(f".{path.stem}.*.sqlite") if other != database),
+            key=lambda other: other.stat().st_mtime, reverse=True
+        )
+        for stale_path in older[1:]:
+            stale_path.unlink(missing_ok=True)
+    
+    with closing(sqlite3.connect(database)) as conn:
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(rows)') if row[1] != 'position']
+    return {'database': database, 'columns': columns}
+
+# Load and process data. One frame per dataset version is shared by every
+# session (cache_data would hand each call its own unpickled copy)
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def load_data(fingerprint, _previous=None):
+    try:
+        if STORAGE_BACKEND == 'sqlite':
+            return load_database(DATA_FILE, fingerprint)
+        return read_normalized_data(DATA_FILE, fingerprint, _previous)
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         return None
 
-# Load the data
-df = load_data()
+# Raw Data grid page sizes
+RAW_DATA_PAGE_SIZES = [50, 100, 250, 500]
+DEFAULT_RAW_DATA_PAGE_SIZE = 100
+
+# Rows serialized at a time by the CSV export
+EXPORT_CHUNK_ROWS = 50000
+
+# Exports of more rows than this are gzip-compressed
+EXPORT_GZIP_ROWS = 100000
+
+def count_rows(df):
+    """Number of normalized rows in a frame or database handle."""
+    if get_database(df):
+        return int(query_database(df, 'SELECT COUNT(*) AS n FROM rows')['n'].iloc[0])
+    return len(df)
+
+def raw_data_columns(df):
+    """Columns of the Raw Data view: the normalized ones plus 'End date' next to 'date'."""
+    columns = list(df['columns'] if get_database(df) else df.columns)
+    columns.insert(columns.index('date') + 1, 'End date')
+    return columns
+
+def get_raw_data_page(df, start, stop, columns):
+    """Rows start to stop of the Raw Data view, with only the given columns."""
+    # 'End date' is not stored; it is a copy of 'date'
+    wanted = set(columns) | ({'date'} if 'End date' in columns else set())
+    stored = [column for column in raw_data_columns(df) if column in wanted and column != 'End date']
+    if get_database(df):
+        page = read_database_rows(df, limit=stop - start, offset=start, columns=stored)
+    else:
+        page = df.iloc[start:stop][stored]
+    if 'End date' in columns:
+        page = with_end_date(page)
+    page = page[columns]
+    page.index = pd.RangeIndex(start, start + len(page))
+    return page
+
+def iter_export_chunks(df):
+    """The Raw Data view in dataset order, EXPORT_CHUNK_ROWS rows at a time."""
+    if get_database(df):
+        columns = ', '.join(map(quote_column, df['columns']))
+        with closing(sqlite3.connect(get_database(df))) as conn:
+            for chunk in pd.read_sql_query(f"SELECT {columns} FROM rows ORDER BY position", conn, chunksize=EXPORT_CHUNK_ROWS):
+                yield with_end_date(restore_rows(chunk))
+    else:
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            yield with_end_date(df.iloc[start:start + EXPORT_CHUNK_ROWS])
+
+# Export files are large: built only once a session asks for a download
+@st.cache_resource(show_spinner=False, max_entries=DATASET_CACHE_SIZE)
+def get_csv_export(_df, dataset_version):
+    """CSV export of the dataset as (bytes, gzipped), serialized chunk by chunk.
+
+    Built only when someone asks for a download, then shared by every session
+    on this version. Large exports are gzip-compressed.
+    """
+    buffer = io.BytesIO()
+    gzipped = count_rows(_df) > EXPORT_GZIP_ROWS
+    output = gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6) if gzipped else buffer
+    header = True
+    for chunk in iter_export_chunks(_df):
+        output.write(chunk.to_csv(index=False, header=header).encode())
+        header = False
+    if header:
+        output.write((','.join(raw_data_columns(_df)) + '\n').encode())
+    if gzipped:
+        output.close()
+    return buffer.getvalue(), gzipped
+
+def display_raw_data(df, dataset_version, key, download_label, file_name):
+    """Raw Data grid: one page of rows with the chosen columns, and a CSV export built on request."""
+    columns = raw_data_columns(df)
+    selected_columns = st.multiselect("Columns", columns, default=columns, key=f"{key}_columns")
+    
+    # Pagination: only the current page is read and sent to the browser
+    row_count = count_rows(df)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        page_size = st.selectbox(
+            "Rows per page",
+            RAW_DATA_PAGE_SIZES,
+            index=RAW_DATA_PAGE_SIZES.index(DEFAULT_RAW_DATA_PAGE_SIZE),
+            key=f"{key}_page_size"
+        )
+    page_count = max(1, -(-row_count // page_size))
+    with col2:
+        # A number input, not a selectbox: one option per page would be sent on every rerun
+        page = int(st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key=f"{key}_page"))
+    start, stop = (page - 1) * page_size, min(page * page_size, row_count)
+    with col3:
+        st.write(f"Showing rows {start + 1}-{stop} of {row_count}" if stop > start else f"No rows to show ({row_count} total)")
+    
+    if selected_columns:
+        st.dataframe(get_raw_data_page(df, start, stop, selected_columns))
+    else:
+        st.info("Select at least one column to show")
+    
+    # The export is only serialized once someone asks for it
+    if dataset_version not in st.session_state['requested_exports']:
+        if st.button("Prepare Download", key=f"prepare_{key}"):
+            st.session_state['requested_exports'].add(dataset_version)
+    if dataset_version in st.session_state['requested_exports']:
+        data, gzipped = get_csv_export(df, dataset_version)
+        st.download_button(
+            label=download_label,
+            data=data,
+            file_name=f"{file_name}.gz" if gzipped else file_name,
+            mime="application/gzip" if gzipped else "text/csv",
+            key=f"download_{key}"
+        )
+
+# Seconds to wait after the last change to the data file before rebuilding, so an
+# export that is still being written is not read half-way
+RELOAD_DELAY = 2.0
+
+def warm_dataset_caches(df, version):
+    """Build every per-version structure so no rerun pays for it on the new version."""
+    builds = [get_student_directory, get_search_index, get_filter_index, get_cohort_summary,
+              get_student_progress, get_roster_base, get_student_list, get_diagnostic_levels,
+              get_cohort_points, get_class_cube]
+    if not get_database(df):
+        # Row-level structures; a database answers these queries itself
+        builds = [get_student_index] + builds + [get_percentile_tables]
+    for build in builds:
+        build(df, version)
+
+def refresh_dataset(store):
+    """Load the current version of the data file, warm its caches, then swap it in.
+
+    The (version, frame) pair is replaced in one assignment, so a rerun sees
+    either the old dataset or the fully built new one. A version that fails to
+    load does not replace a working one.
+    """
+    with store['build_lock']:
+        version = source_fingerprint(DATA_FILE)
+        active_version, active_df = store['active']
+        if version == active_version and active_df is not None:
+            return
+        df = load_data(version, store['active'])
+        if df is None and active_df is not None:
+            return
+        if df is not None:
+            warm_dataset_caches(df, version)
+        store['active'] = (version, df)
+
+def schedule_refresh(store):
+    """(Re)start the rebuild timer, so a burst of writes leads to a single rebuild."""
+    if store['timer'] is not None:
+        store['timer'].cancel()
+    store['timer'] = threading.Timer(RELOAD_DELAY, refresh_dataset, args=(store,))
+    store['timer'].daemon = True
+    store['timer'].start()
+
+class DataFileHandler(FileSystemEventHandler):
+    """Schedules a rebuild when the data file is written, replaced or moved into place."""
+    
+    def __init__(self, store):
+        self.store = store
+    
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        paths = [event.src_path, getattr(event, 'dest_path', '')]
+        if any(path and Path(path).name == DATA_FILE.name for path in paths):
+            schedule_refresh(self.store)
+
+def start_data_watcher(store):
+    """Watch the data file's folder in a background thread (None if watching is unavailable)."""
+    if Observer is None or not DATA_FILE.parent.is_dir():
+        return None
+    observer = Observer()
+    observer.daemon = True
+    try:
+        observer.schedule(DataFileHandler(store), str(DATA_FILE.parent), recursive=False)
+        observer.start()
+    except Exception:
+        return None
+    return observer
+
+@st.cache_resource
+def get_dataset_store():
+    """Process-wide holder of the served (version, frame) pair and the watcher that updates it."""
+    store = {
+        'active': (None, None), 'build_lock': threading.Lock(), 'timer': None,
+        'uploads': {}, 'rejected_uploads': {}, 'upload_lock': threading.Lock(), 'upload_locks': {}
+    }
+    store['observer'] = start_data_watcher(store)
+    return store
+
+def get_active_dataset():
+    """The (version, frame) pair this rerun works with.
+
+    The watcher rebuilds off the request path; reruns only build when nothing
+    has been loaded yet or when there is no watcher.
+    """
+    store = get_dataset_store()
+    if store['observer'] is None or store['active'][1] is None:
+        refresh_dataset(store)
+    return store['active']
+
+# Uploaded datasets kept in the store; the oldest is dropped beyond this, so
+# every published upload still fits in the per-version caches
+UPLOAD_MAX_DATASETS = DATASET_CACHE_SIZE - 2
+# Issues of rejected uploads, remembered so the same file is not processed again
+UPLOAD_MAX_REJECTED = 32
+
+def upload_version(uploaded_file):
+    """Dataset version of an upload: a sha256 of its bytes (and the normalizer version), read in blocks."""
+    digest = hashlib.sha256(f"{NORMALIZED_CACHE_VERSION}:".encode())
+    uploaded_file.seek(0)
+    for block in iter(lambda: uploaded_file.read(1 << 20), b''):
+        digest.update(block)
+    uploaded_file.seek(0)
+    return f"upload-{digest.hexdigest()[:16]}"
+
+def publish_upload(store, version, uploaded_file):
+    """Normalize an upload and publish it as a dataset every session can select; returns its issues.
+
+    Uploads are keyed by content, so the same file uploaded again, from any
+    session, reuses the published dataset (or its issues) without processing.
+    Only uploads of the same content wait for each other; the store-wide lock
+    is held just to update the maps.
+    """
+    entry = store['uploads'].get(version) or store['rejected_uploads'].get(version)
+    if entry is not None:
+        return entry
+    with store['upload_lock']:
+        version_lock = store['upload_locks'].setdefault(version, threading.Lock())
+    with version_lock:
+        entry = store['uploads'].get(version) or store['rejected_uploads'].get(version)
+        if entry is None:
+            df, issues = process_uploaded_csv(uploaded_file)
+            if df is not None:
+                warm_dataset_caches(df, version)
+            entry = {'name': uploaded_file.name, 'uploaded': datetime.now(), 'df': df, 'issues': issues}
+            with store['upload_lock']:
+                # Rejected uploads are kept apart so they never evict a published dataset
+                published = store['uploads'] if df is not None else store['rejected_uploads']
+                published[version] = entry
+                while len(published) > (UPLOAD_MAX_DATASETS if df is not None else UPLOAD_MAX_REJECTED):
+                    published.pop(next(iter(published)))
+    with store['upload_lock']:
+        store['upload_locks'].pop(version, None)
+    return entry
+
+def clear_student_selection():
+    """Forget selected students when switching datasets; their IDs belong to the previous one."""
+    st.session_state['selected_students'] = set()
+    st.session_state['selected_student'] = None
+    st.session_state['requested_reports'] = set()
+
+# Pick the dataset: the data file, or an upload published by any session.
+# The choice lives in session_state rather than in a keyed widget: the options
+# change whenever any session publishes or evicts an upload, which gives the
+# selectbox a new identity, so it is re-created at the chosen index each run
+dataset_store = get_dataset_store()
+uploaded_datasets = dict(list(dataset_store['uploads'].items()))
+chosen_dataset = st.session_state.pop('dataset_request', st.session_state.get('dataset_id'))
+if chosen_dataset not in uploaded_datasets:
+    chosen_dataset = None
+dataset_options = [None] + list(uploaded_datasets)
+selected_dataset = st.sidebar.selectbox(
+    "Dataset",
+    dataset_options,
+    index=dataset_options.index(chosen_dataset),
+    format_func=lambda version: (
+        f"Data file ({DATA_FILE.name})" if version is None
+        else f"{uploaded_datasets[version]['name']} (uploaded {uploaded_datasets[version]['uploaded']:%b %d %H:%M})"
+    )
+)
+if selected_dataset != st.session_state.get('dataset_id'):
+    # Picked here, requested by an upload, or evicted by another session
+    clear_student_selection()
+st.session_state['dataset_id'] = selected_dataset
+
+# Load the data; the version is the source file fingerprint (or the upload's) and changes with the content
+if selected_dataset is None:
+    dataset_version, df = get_active_dataset()
+else:
+    dataset_version, df = selected_dataset, uploaded_datasets[selected_dataset]['df']
+if isinstance(df, pd.DataFrame):
+    # A shallow per-session handle: adding or replacing columns stays private to the session
+    df = df.copy(deep=False)
 
 if df is not None:
+    if debug_mode and not get_database(df):
+        memory = get_memory_report(df, dataset_version)
+        st.sidebar.markdown("### Memory Usage")
+        st.sidebar.dataframe(memory)
+        total = memory.loc['Total']
+        st.sidebar.write(f"{total['before'] / 1e6:.1f} MB → {total['after'] / 1e6:.1f} MB")
+    
     # Initialize session state
     if 'active_tab' not in st.session_state:
         st.session_state['active_tab'] = "Student Dashboard"
@@ -1767,7 +3235,7 @@ if df is not None:
         st.session_state['selected_student'] = None
     
     # Create tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["Student Dashboard", "Student List", "Comparison View", "Raw Data"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Student Dashboard", "Student List", "Comparison View", "Class View", "Cohort View", "Raw Data"])
     
     # Student Dashboard Tab
     with tab1:
@@ -1782,35 +3250,24 @@ if df is not None:
         with col2:
             subject_filter = st.selectbox(
                 "Filter by Subject",
-                ["All"] + list(df['subject'].unique()),
+                ["All"] + get_filter_options(df, dataset_version, 'subject'),
                 key="dashboard_subject"
             )
         
         with col3:
             date_filter = st.selectbox(
                 "Filter by Date",
-                ["All"] + [d.strftime('%Y-%m-%d') if pd.notnull(d) else 'Unknown' for d in df['date'].unique()],
+                ["All"] + get_filter_options(df, dataset_version, 'date'),
                 key="dashboard_date"
             )
         
-        # Filter data based on search and filters
-        filtered_df = df.copy()
+        # Students with rows matching the subject and date filters, narrowed by the search
+        students = filter_students(df, dataset_version, subject=subject_filter, date=date_filter)
         if search_term:
-            filtered_df = filtered_df[
-                filtered_df['first_name'].str.contains(search_term, case=False) |
-                filtered_df['last_name'].str.contains(search_term, case=False) |
-                filtered_df['student_id'].astype(str).str.contains(search_term, case=False)
-            ]
-        
-        if subject_filter != "All":
-            filtered_df = filtered_df[filtered_df['subject'] == subject_filter]
-        
-        if date_filter != "All":
-            filtered_df = filtered_df[filtered_df['date'].dt.strftime('%Y-%m-%d') == date_filter]
+            students = students[np.isin(students, search_students(df, dataset_version, search_term))]
         
         # Student selection
-        if not filtered_df.empty:
-            students = filtered_df['student_id'].unique()
+        if len(students) > 0:
             
             # If a student was selected from the list, use that student
             selected_student = None
@@ -1821,15 +3278,16 @@ if df is not None:
             
             # If no student was selected from the list, use the selectbox
             if selected_student is None:
+                student_names = get_student_directory(df, dataset_version)['names']
                 selected_student = st.selectbox(
                     "Select Student",
                     options=students,
-                    format_func=lambda x: f"{filtered_df[filtered_df['student_id'] == x]['first_name'].iloc[0]} {filtered_df[filtered_df['student_id'] == x]['last_name'].iloc[0]}",
+                    format_func=lambda x: student_names[x],
                     key="dashboard_student_select"
                 )
             
             if st.button("Analyze Student", key="dashboard_analyze"):
-                display_student_dashboard(selected_student, date_filter)
+                display_student_dashboard(selected_student, df, dataset_version, date_filter)
         else:
             st.warning("No students found matching the search criteria.")
     
@@ -1837,31 +3295,22 @@ if df is not None:
     with tab2:
         st.title("Student List")
         
-        # Group students by ID and get unique students
-        unique_students = df.groupby('student_id').agg({
-            'first_name': 'first',
-            'last_name': 'first',
-            'teacher_name': 'first',
-            'date': 'max'
-        }).reset_index()
+        # One row per student, built once per dataset version
+        unique_students = get_student_list(df, dataset_version)
         
         # Add search functionality for the student list
         search_term = st.text_input("Search students", "", key="student_search")
         
         # Filter students based on search
         if search_term:
-            unique_students = unique_students[
-                unique_students['first_name'].str.contains(search_term, case=False) |
-                unique_students['last_name'].str.contains(search_term, case=False) |
-                unique_students['student_id'].astype(str).str.contains(search_term, case=False)
-            ]
+            unique_students = unique_students[unique_students['student_id'].isin(search_students(df, dataset_version, search_term))]
         
         # Add filter and sort options
         col1, col2 = st.columns(2)
         with col1:
             filter_option = st.selectbox(
                 "Filter by",
-                ["All", "Teacher", "Subject", "Progress Level"],
+                ["All", "Teacher", "Subject", "Progress Level", "At Risk"],
                 key="student_filter"
             )
             
@@ -1877,12 +3326,11 @@ if df is not None:
             elif filter_option == "Subject":
                 subject_filter = st.selectbox(
                     "Select Subject",
-                    ["All"] + list(df['subject'].unique()),
+                    ["All"] + get_filter_options(df, dataset_version, 'subject'),
                     key="subject_filter"
                 )
                 if subject_filter != "All":
-                    student_ids_with_subject = df[df['subject'] == subject_filter]['student_id'].unique()
-                    unique_students = unique_students[unique_students['student_id'].isin(student_ids_with_subject)]
+                    unique_students = unique_students[unique_students['student_id'].isin(filter_students(df, dataset_version, subject=subject_filter))]
             
             elif filter_option == "Progress Level":
                 progress_level = st.selectbox(
@@ -1891,20 +3339,32 @@ if df is not None:
                     key="progress_filter"
                 )
                 if progress_level != "All":
-                    student_progress = {}
-                    for student_id in unique_students['student_id']:
-                        student_data = df[df['student_id'] == student_id]
-                        progress = calculate_progress(student_data)
-                        student_progress[student_id] = progress
+                    student_progress = unique_students['student_id'].map(get_student_progress(df, dataset_version))
                     
                     if progress_level == "High (80%+)":
-                        filtered_ids = [sid for sid, prog in student_progress.items() if prog >= 80]
+                        unique_students = unique_students[student_progress >= 80]
                     elif progress_level == "Medium (40-79%)":
-                        filtered_ids = [sid for sid, prog in student_progress.items() if 40 <= prog < 80]
+                        unique_students = unique_students[(student_progress >= 40) & (student_progress < 80)]
                     else:  # Low (<40%)
-                        filtered_ids = [sid for sid, prog in student_progress.items() if prog < 40]
-                    
-                    unique_students = unique_students[unique_students['student_id'].isin(filtered_ids)]
+                        unique_students = unique_students[student_progress < 40]
+            
+            elif filter_option == "At Risk":
+                # Students with any danger alert, read from the roster status table
+                today = pd.Timestamp.now().normalize()
+                at_risk_table = get_at_risk_table(df, dataset_version, today)
+                unique_students = unique_students[unique_students['student_id'].isin(at_risk_table.index)]
+                # The report is only generated once someone asks for it
+                if dataset_version not in st.session_state['requested_at_risk_reports']:
+                    if st.button("Prepare At-Risk Report", key="prepare_at_risk"):
+                        st.session_state['requested_at_risk_reports'].add(dataset_version)
+                if dataset_version in st.session_state['requested_at_risk_reports']:
+                    st.download_button(
+                        label="Download At-Risk Report",
+                        data=build_at_risk_report(df, dataset_version, today),
+                        file_name="at_risk_students.csv",
+                        mime="text/csv",
+                        key="download_at_risk"
+                    )
         
         with col2:
             sort_option = st.selectbox(
@@ -1916,20 +3376,10 @@ if df is not None:
         if sort_option == "Name":
             unique_students = unique_students.sort_values(['first_name', 'last_name'])
         elif sort_option == "Progress (High to Low)":
-            student_progress = {}
-            for student_id in unique_students['student_id']:
-                student_data = df[df['student_id'] == student_id]
-                progress = calculate_progress(student_data)
-                student_progress[student_id] = progress
-            unique_students['progress'] = unique_students['student_id'].map(student_progress)
+            unique_students = unique_students.assign(progress=unique_students['student_id'].map(get_student_progress(df, dataset_version)))
             unique_students = unique_students.sort_values('progress', ascending=False)
         elif sort_option == "Progress (Low to High)":
-            student_progress = {}
-            for student_id in unique_students['student_id']:
-                student_data = df[df['student_id'] == student_id]
-                progress = calculate_progress(student_data)
-                student_progress[student_id] = progress
-            unique_students['progress'] = unique_students['student_id'].map(student_progress)
+            unique_students = unique_students.assign(progress=unique_students['student_id'].map(get_student_progress(df, dataset_version)))
             unique_students = unique_students.sort_values('progress')
         elif sort_option == "Last Activity":
             unique_students = unique_students.sort_values('date', ascending=False)
@@ -1954,16 +3404,9 @@ if df is not None:
                 # Create a report for selected students
                 report_data = []
                 for student_id in st.session_state['selected_students']:
-                    summary = get_student_summary(df, student_id)
+                    summary = get_student_summary(df, dataset_version, student_id)
                     if summary:
-                        report_data.append({
-                            'student_name': summary['name'],
-                            'teacher': summary['teacher'],
-                            'total_questions': summary['total_questions'],
-                            'total_skills_practiced': summary['total_skills_practiced'],
-                            'total_skills_mastered': summary['total_skills_mastered'],
-                            'latest_date': summary['latest_date'].strftime('%Y-%m-%d') if pd.notnull(summary['latest_date']) else 'Unknown'
-                        })
+                        report_data.append(get_report_record(summary))
                 
                 if report_data:
                     report_df = pd.DataFrame(report_data)
@@ -1980,11 +3423,38 @@ if df is not None:
         with col4:
             st.write(f"Selected: {len(st.session_state['selected_students'])} students")
         
+        # Pagination: only the current page's cards are built and sent
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            page_size = st.selectbox(
+                "Students per page",
+                STUDENT_LIST_PAGE_SIZES,
+                index=STUDENT_LIST_PAGE_SIZES.index(DEFAULT_STUDENT_LIST_PAGE_SIZE),
+                key="student_page_size"
+            )
+        page_count = max(1, -(-len(unique_students) // page_size))
+        with col2:
+            # A number input, not a selectbox: one option per page would be sent on every rerun
+            page = int(st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="student_page"))
+        page_students = unique_students.iloc[(page - 1) * page_size:page * page_size]
+        with col3:
+            if page_students.empty:
+                st.write(f"No students to show ({len(get_student_list(df, dataset_version))} total)")
+            else:
+                st.write(
+                    f"Showing {(page - 1) * page_size + 1}-{(page - 1) * page_size + len(page_students)} "
+                    f"of {len(unique_students)} students ({len(get_student_list(df, dataset_version))} total)"
+                )
+        
+        # Status and alerts for the students on this page, read by every card
+        roster_status = get_roster_status(df, dataset_version, page_students['student_id'])
+        directory = get_student_directory(df, dataset_version)
+        
         # Display students in cards
-        for _, student in unique_students.iterrows():
-            status = get_student_status_indicators(student['student_id'], df)
-            if status is None:
+        for _, student in page_students.iterrows():
+            if student['student_id'] not in roster_status.index:
                 continue
+            status = roster_status.loc[student['student_id']]
             
             with st.container():
                 box_class = "student-box selected" if student['student_id'] in st.session_state['selected_students'] else "student-box"
@@ -1992,15 +3462,13 @@ if df is not None:
                 
                 # Student header with name and selection button
                 activity_icon, activity_text, status_class = get_activity_status(status['days_since_activity'])
-                total_subjects = len(df['subject'].unique())
-                student_data = df[df['student_id'] == student['student_id']]
                 
                 st.markdown(
                     f'<div class="student-header">'
                     f'<div class="student-info">'
-                    f'<h3 class="student-name">{student["first_name"]} {student["last_name"]}</h3>'
+                    f'<h3 class="student-name">{directory["names"][student["student_id"]]}</h3>'
                     f'<p class="student-details">ID: {student["student_id"]}</p>'
-                    f'<p class="student-details">Teacher: {student["teacher_name"]}</p>'
+                    f'<p class="student-details">Teacher: {directory["teachers"][student["student_id"]]}</p>'
                     f'</div>'
                     f'<div class="student-actions">'
                     f'<div class="status-indicator {status_class}">'
@@ -2011,6 +3479,17 @@ if df is not None:
                     unsafe_allow_html=True
                 )
                 
+                # Alerts from the roster status flags
+                alerts = get_student_alerts(status)
+                if alerts:
+                    st.markdown(
+                        ''.join(
+                            f'<div class="alert-item alert-{alert["type"]}">{alert["icon"]} {alert["message"]}</div>'
+                            for alert in alerts
+                        ),
+                        unsafe_allow_html=True
+                    )
+                
                 # Selection checkbox
                 is_selected = st.checkbox(
                     "Select for comparison",
@@ -2031,24 +3510,18 @@ if df is not None:
                         st.session_state['active_tab'] = "Student Dashboard"
                         st.experimental_rerun()
                 with col2:
-                    summary = get_student_summary(df, student['student_id'])
-                    report_data = [{
-                        'student_name': summary['name'],
-                        'teacher': summary['teacher'],
-                        'total_questions': summary['total_questions'],
-                        'total_skills_practiced': summary['total_skills_practiced'],
-                        'total_skills_mastered': summary['total_skills_mastered'],
-                        'latest_date': summary['latest_date'].strftime('%Y-%m-%d') if pd.notnull(summary['latest_date']) else 'Unknown'
-                    }]
-                    report_df = pd.DataFrame(report_data)
-                    csv = report_df.to_csv(index=False)
-                    st.download_button(
-                        label="Download Report",
-                        data=csv,
-                        file_name=f"student_report_{student['student_id']}.csv",
-                        mime="text/csv",
-                        key=f"list_report_btn_{student['student_id']}"
-                    )
+                    # The report is only generated once someone asks for it
+                    if student['student_id'] not in st.session_state['requested_reports']:
+                        if st.button("Prepare Report", key=f"list_prepare_report_btn_{student['student_id']}"):
+                            st.session_state['requested_reports'].add(student['student_id'])
+                    if student['student_id'] in st.session_state['requested_reports']:
+                        st.download_button(
+                            label="Download Report",
+                            data=build_student_report(df, student['student_id'], dataset_version),
+                            file_name=f"student_report_{student['student_id']}.csv",
+                            mime="text/csv",
+                            key=f"list_report_btn_{student['student_id']}"
+                        )
                 with col3:
                     if st.button("Compare with Class", key=f"list_compare_btn_{student['student_id']}"):
                         st.session_state['selected_students'].add(student['student_id'])
@@ -2063,349 +3536,245 @@ if df is not None:
         if len(st.session_state['selected_students']) == 0:
             st.warning("No students selected for comparison. Please select students from the Student List tab.")
         else:
-            # Display comparison view for selected students
-            for student_id in st.session_state['selected_students']:
-                summary = get_student_summary(df, student_id)
-                if summary:
-                    with st.expander(f"{summary['name']} - {summary['teacher']}", expanded=True):
-                        # Overall Progress
-                        st.subheader("Overall Progress")
-                        col1, col2, col3, col4 = st.columns(4)
-                        with col1:
-                            st.metric("Total Questions", summary['total_questions'])
-                        with col2:
-                            st.metric("Skills Practiced", summary['total_skills_practiced'])
-                        with col3:
-                            st.metric("Skills Mastered", summary['total_skills_mastered'])
-                        with col4:
-                            avg_growth = round(sum(data['predicted_growth'] for data in summary['subject_breakdown'].values()) / len(summary['subject_breakdown']))
-                            st.metric("Predicted Growth", f"+{avg_growth}%", 
-                                    delta=f"+{avg_growth - 50}%" if avg_growth > 50 else None)
-                        
-                        # Subject Comparison Chart
-                        st.subheader("Subject Comparison")
-                        subjects = list(summary['subject_breakdown'].keys())
-                        progress_values = [data['progress'] for data in summary['subject_breakdown'].values()]
-                        mastery_rates = [data['mastery_rate'] for data in summary['subject_breakdown'].values()]
-                        efficiency_scores = [data['efficiency'] for data in summary['subject_breakdown'].values()]
-                        
-                        fig = go.Figure(data=[
-                            go.Bar(name='Progress', x=subjects, y=progress_values, marker_color='#7ba7c2'),
-                            go.Bar(name='Mastery Rate', x=subjects, y=mastery_rates, marker_color='#5d8aa8'),
-                            go.Bar(name='Efficiency', x=subjects, y=efficiency_scores, marker_color='#d1b280')
-                        ])
-                        
-                        fig.update_layout(
-                            barmode='group',
-                            title='Subject Performance Comparison',
-                            xaxis_title='Subject',
-                            yaxis_title='Percentage',
-                            plot_bgcolor='rgba(0,0,0,0)',
-                            paper_bgcolor='rgba(0,0,0,0)'
-                        )
-                        
-                        st.plotly_chart(fig, use_container_width=True)
-                        
-                        # Metric Breakdown Charts
-                        st.subheader("Metric Breakdown")
-                        
-                        # Create tabs for different metric visualizations
-                        metric_tabs = st.tabs(["Skills Progress", "IXL Progress", "IXL Term Performance"])
-                        
-                        with metric_tabs[0]:
-                            # Skills Progress Chart
-                            fig = go.Figure()
+            # Side by side: one students x metrics matrix drawn as a few charts, so the
+            # cost grows with the metrics rather than with the number of students
+            comparison_mode = st.radio(
+                "Comparison Mode", ["Side by Side", "Individual Students"], horizontal=True, key="comparison_mode"
+            )
+            if comparison_mode == "Side by Side":
+                selected_ids = tuple(sorted(st.session_state['selected_students']))
+                st.dataframe(get_comparison_matrix(df, dataset_version, selected_ids), use_container_width=True)
+                chart_tabs = st.tabs(["Subject Metrics", "Heatmap", "Parallel Coordinates"])
+                for chart_tab, kind in zip(chart_tabs, COMPARISON_CHARTS):
+                    with chart_tab:
+                        st.plotly_chart(get_comparison_figure(df, dataset_version, selected_ids, kind), use_container_width=True)
+            else:
+                # Display comparison view for selected students
+                for student_id in st.session_state['selected_students']:
+                    summary = get_student_summary(df, dataset_version, student_id)
+                    if summary:
+                        student_data = with_end_date(get_student_rows(df, dataset_version, student_id))
+                        with st.expander(f"{summary['name']} - {summary['teacher']}", expanded=True):
+                            # Overall Progress
+                            st.subheader("Overall Progress")
+                            col1, col2, col3, col4 = st.columns(4)
+                            with col1:
+                                st.metric("Total Questions", summary['total_questions'])
+                            with col2:
+                                st.metric("Skills Practiced", summary['total_skills_practiced'])
+                            with col3:
+                                st.metric("Skills Mastered", summary['total_skills_mastered'])
+                            with col4:
+                                avg_growth = round(sum(data['predicted_growth'] for data in summary['subject_breakdown'].values()) / len(summary['subject_breakdown']))
+                                st.metric("Predicted Growth", f"+{avg_growth}%", 
+                                        delta=f"+{avg_growth - 50}%" if avg_growth > 50 else None)
                             
-                            for subject in subjects:
-                                subject_data = summary['subject_breakdown'][subject]
-                                fig.add_trace(go.Bar(
-                                    name=subject,
-                                    x=['Skills Practiced', 'Skills Mastered'],
-                                    y=[subject_data['skills_practiced'], subject_data['skills_mastered']],
-                                    text=[subject_data['skills_practiced'], subject_data['skills_mastered']],
-                                    textposition='auto',
-                                    textfont=dict(
-                                        color='black',
-                                        size=12,
-                                        family='Arial'
-                                    )
-                                ))
+                            # Subject Comparison Chart
+                            st.subheader("Subject Comparison")
+                            st.plotly_chart(get_student_figure(df, dataset_version, student_id, 'comparison_subjects'), use_container_width=True)
                             
-                            fig.update_layout(
-                                title={
-                                    'text': 'Skills Progress by Subject',
-                                    'font': dict(
-                                        color='black',
-                                        size=18,
-                                        family='Arial'
-                                    ),
-                                    'x': 0.5,
-                                    'y': 0.95
-                                },
-                                barmode='group',
-                                xaxis_title='Metric',
-                                yaxis_title='Count',
-                                plot_bgcolor='white',
-                                paper_bgcolor='white',
-                                font=dict(
-                                    color='black',
-                                    size=12,
-                                    family='Arial'
-                                ),
-                                xaxis=dict(
-                                    tickfont=dict(
-                                        color='black',
-                                        size=10,
-                                        family='Arial'
-                                    )
-                                ),
-                                yaxis=dict(
-                                    tickfont=dict(
-                                        color='black',
-                                        size=10,
-                                        family='Arial'
-                                    )
-                                ),
-                                margin=dict(t=50, b=50, l=50, r=50)
-                            )
+                            # Metric Breakdown Charts
+                            st.subheader("Metric Breakdown")
                             
-                            st.plotly_chart(fig, use_container_width=True)
-                        
-                        with metric_tabs[1]:
-                            # IXL Progress Over Time
-                            col1, col2 = st.columns(2)
+                            # Create tabs for different metric visualizations
+                            metric_tabs = st.tabs(["Skills Progress", "IXL Progress", "IXL Term Performance"])
                             
-                            with col1:
-                                # Math Progress Chart
-                                fig_math = go.Figure()
-                                try:
-                                    # Check if required columns exist
-                                    if 'End date' not in student_data.columns or 'Ending diagnostic level - Math' not in student_data.columns:
-                                        st.warning("Required columns for Math progress visualization are missing.")
-                                    else:
-                                        fig_math.add_trace(go.Bar(
-                                            x=student_data['End date'].dt.strftime('%Y-%m-%d'),
-                                            y=student_data['Ending diagnostic level - Math'],
-                                            name='Math Level',
-                                            marker_color='#2196F3',
-                                            text=student_data['Ending diagnostic level - Math'],
-                                            textposition='outside',
-                                            textfont=dict(
-                                                color='black',
-                                                size=12,
-                                                family='Arial'
-                                            ),
-                                            hovertemplate='Date: %{x}<br>Level: %{y}<extra></extra>'
-                                        ))
-                                        fig_math.update_layout(
-                                            title={
-                                                'text': 'Math Diagnostic Level Over Time',
-                                                'x': 0.5,
-                                                'xanchor': 'center',
-                                                'y': 0.95,
-                                                'yanchor': 'top',
-                                                'font': dict(
-                                                    color='black',
-                                                    size=18,
-                                                    family='Arial'
-                                                )
-                                            },
-                                            xaxis_title='Date',
-                                            yaxis_title='Diagnostic Level',
-                                            template='plotly_white',
-                                            height=400,
-                                            font=dict(
-                                                color='black',
-                                                size=12,
-                                                family='Arial'
-                                            ),
-                                            xaxis=dict(
-                                                tickfont=dict(
-                                                    color='black',
-                                                    size=10,
-                                                    family='Arial'
-                                                ),
-                                                tickangle=45
-                                            ),
-                                            yaxis=dict(
-                                                tickfont=dict(
-                                                    color='black',
-                                                    size=10,
-                                                    family='Arial'
-                                                )
-                                            ),
-                                            margin=dict(t=50, b=50, l=50, r=50),
-                                            plot_bgcolor='white',
-                                            paper_bgcolor='white'
-                                        )
-                                        st.plotly_chart(fig_math, use_container_width=True)
-                                except Exception as e:
-                                    st.error(f"Error creating Math progress chart: {str(e)}")
+                            with metric_tabs[0]:
+                                # Skills Progress Chart
+                                st.plotly_chart(get_student_figure(df, dataset_version, student_id, 'skills'), use_container_width=True)
                             
-                            with col2:
-                                # ELA Progress Chart
-                                fig_ela = go.Figure()
-                                try:
-                                    # Check if required columns exist
-                                    if 'End date' not in student_data.columns or 'Ending diagnostic level - ELA' not in student_data.columns:
-                                        st.warning("Required columns for ELA progress visualization are missing.")
-                                    else:
-                                        fig_ela.add_trace(go.Bar(
-                                            x=student_data['End date'].dt.strftime('%Y-%m-%d'),
-                                            y=student_data['Ending diagnostic level - ELA'],
-                                            name='ELA Level',
-                                            marker_color='#FFC107',
-                                            text=student_data['Ending diagnostic level - ELA'],
-                                            textposition='outside',
-                                            textfont=dict(
-                                                color='black',
-                                                size=12,
-                                                family='Arial'
-                                            ),
-                                            hovertemplate='Date: %{x}<br>Level: %{y}<extra></extra>'
-                                        ))
-                                        fig_ela.update_layout(
-                                            title={
-                                                'text': 'ELA Diagnostic Level Over Time',
-                                                'x': 0.5,
-                                                'xanchor': 'center',
-                                                'y': 0.95,
-                                                'yanchor': 'top',
-                                                'font': dict(
-                                                    color='black',
-                                                    size=18,
-                                                    family='Arial'
-                                                )
-                                            },
-                                            xaxis_title='Date',
-                                            yaxis_title='Diagnostic Level',
-                                            template='plotly_white',
-                                            height=400,
-                                            font=dict(
-                                                color='black',
-                                                size=12,
-                                                family='Arial'
-                                            ),
-                                            xaxis=dict(
-                                                tickfont=dict(
-                                                    color='black',
-                                                    size=10,
-                                                    family='Arial'
-                                                ),
-                                                tickangle=45
-                                            ),
-                                            yaxis=dict(
-                                                tickfont=dict(
-                                                    color='black',
-                                                    size=10,
-                                                    family='Arial'
-                                                )
-                                            ),
-                                            margin=dict(t=50, b=50, l=50, r=50),
-                                            plot_bgcolor='white',
-                                            paper_bgcolor='white'
-                                        )
-                                        st.plotly_chart(fig_ela, use_container_width=True)
-                                except Exception as e:
-                                    st.error(f"Error creating ELA progress chart: {str(e)}")
-                        
-                        with metric_tabs[2]:
-                            # IXL Term Performance
-                            try:
-                                # Check if required columns exist
-                                if 'End date' not in student_data.columns:
-                                    st.warning("Required date column for term performance visualization is missing.")
-                                    st.stop()
-                                
-                                # Add term information
-                                def get_term(date):
-                                    if pd.isna(date): return None
-                                    month = date.month
-                                    if 8 <= month <= 12: return "Fall"
-                                    elif 1 <= month <= 6: return "Spring"
-                                    return None
-                                
-                                student_data['Term'] = student_data['End date'].apply(get_term)
-                                
-                                # Term selection
-                                selected_term = st.selectbox("Select Term", ["Fall", "Spring"])
-                                term_data = student_data[student_data['Term'] == selected_term]
-                                
-                                if term_data.empty:
-                                    st.warning(f"No data available for {selected_term} term.")
-                                    st.stop()
-                                
-                                # Get the most recent diagnostic for this term
-                                latest_data = term_data.sort_values(by="End date", ascending=False).iloc[0]
-                                
-                                # Calculate percentiles
-                                math_start_pct = get_percentile(
-                                    df[df['Term'] == selected_term]['Starting diagnostic level - Math'],
-                                    latest_data['Starting diagnostic level - Math']
-                                )
-                                
-                                math_end_pct = get_percentile(
-                                    df[df['Term'] == selected_term]['Ending diagnostic level - Math'],
-                                    latest_data['Ending diagnostic level - Math']
-                                )
-                                
-                                ela_start_pct = get_percentile(
-                                    df[df['Term'] == selected_term]['Starting diagnostic level - ELA'],
-                                    latest_data['Starting diagnostic level - ELA']
-                                )
-                                
-                                ela_end_pct = get_percentile(
-                                    df[df['Term'] == selected_term]['Ending diagnostic level - ELA'],
-                                    latest_data['Ending diagnostic level - ELA']
-                                )
-                                
-                                # Create two columns for the donut charts
+                            with metric_tabs[1]:
+                                # IXL Progress Over Time
                                 col1, col2 = st.columns(2)
                                 
                                 with col1:
-                                    if math_start_pct is not None and math_end_pct is not None:
-                                        st.plotly_chart(draw_donut_chart("Math", math_start_pct, math_end_pct, selected_term), use_container_width=True)
-                                    else:
-                                        st.info("Student Has Not Completed Enough Math Training-Sets To Receive a Score")
+                                    # Math Progress Chart
+                                    try:
+                                        # Check if required columns exist
+                                        if 'End date' not in student_data.columns or 'Ending diagnostic level - Math' not in student_data.columns:
+                                            st.warning("Required columns for Math progress visualization are missing.")
+                                        else:
+                                            fig_math = get_student_figure(df, dataset_version, student_id, 'math_levels')
+                                            st.plotly_chart(fig_math, use_container_width=True)
+                                    except Exception as e:
+                                        st.error(f"Error creating Math progress chart: {str(e)}")
                                 
                                 with col2:
-                                    if ela_start_pct is not None and ela_end_pct is not None:
-                                        st.plotly_chart(draw_donut_chart("ELA", ela_start_pct, ela_end_pct, selected_term), use_container_width=True)
+                                    # ELA Progress Chart
+                                    try:
+                                        # Check if required columns exist
+                                        if 'End date' not in student_data.columns or 'Ending diagnostic level - ELA' not in student_data.columns:
+                                            st.warning("Required columns for ELA progress visualization are missing.")
+                                        else:
+                                            fig_ela = get_student_figure(df, dataset_version, student_id, 'ela_levels')
+                                            st.plotly_chart(fig_ela, use_container_width=True)
+                                    except Exception as e:
+                                        st.error(f"Error creating ELA progress chart: {str(e)}")
+                            
+                            with metric_tabs[2]:
+                                # IXL Term Performance
+                                try:
+                                    # Check if required columns exist
+                                    if 'End date' not in student_data.columns:
+                                        st.warning("Required date column for term performance visualization is missing.")
                                     else:
-                                        st.info("Student Has Not Completed Enough ELA Training-Sets To Receive a Score")
-                            except Exception as e:
-                                st.error(f"Error creating term performance visualization: {str(e)}")
+                                        # Add term information
+                                        student_data['Term'] = assign_terms(student_data['End date'])
+                                        
+                                        # Term selection
+                                        selected_term = st.selectbox("Select Term", ["Fall", "Spring"], key=f"compare_term_{student_id}")
+                                        term_data = student_data[student_data['Term'] == selected_term]
+                                        
+                                        if term_data.empty:
+                                            st.warning(f"No data available for {selected_term} term.")
+                                        else:
+                                            # Get the most recent diagnostic for this term
+                                            latest_data = term_data.sort_values(by="End date", ascending=False).iloc[0]
+                                            
+                                            # Calculate percentiles
+                                            math_start_pct = get_percentile(
+                                                df, dataset_version, selected_term, 'Starting diagnostic level - Math',
+                                                latest_data['Starting diagnostic level - Math']
+                                            )
+                                            
+                                            math_end_pct = get_percentile(
+                                                df, dataset_version, selected_term, 'Ending diagnostic level - Math',
+                                                latest_data['Ending diagnostic level - Math']
+                                            )
+                                            
+                                            ela_start_pct = get_percentile(
+                                                df, dataset_version, selected_term, 'Starting diagnostic level - ELA',
+                                                latest_data['Starting diagnostic level - ELA']
+                                            )
+                                            
+                                            ela_end_pct = get_percentile(
+                                                df, dataset_version, selected_term, 'Ending diagnostic level - ELA',
+                                                latest_data['Ending diagnostic level - ELA']
+                                            )
+                                            
+                                            # Create two columns for the donut charts
+                                            col1, col2 = st.columns(2)
+                                            
+                                            with col1:
+                                                if math_start_pct is not None and math_end_pct is not None:
+                                                    st.plotly_chart(draw_donut_chart("Math", math_start_pct, math_end_pct, selected_term), use_container_width=True)
+                                                else:
+                                                    st.info("Student Has Not Completed Enough Math Training-Sets To Receive a Score")
+                                            
+                                            with col2:
+                                                if ela_start_pct is not None and ela_end_pct is not None:
+                                                    st.plotly_chart(draw_donut_chart("ELA", ela_start_pct, ela_end_pct, selected_term), use_container_width=True)
+                                                else:
+                                                    st.info("Student Has Not Completed Enough ELA Training-Sets To Receive a Score")
+                                except Exception as e:
+                                    st.error(f"Error creating term performance visualization: {str(e)}")
     
-    # Raw Data Tab
+    # Class View Tab
     with tab4:
+        st.title("Class View")
+        
+        # Every number here is rolled up from the per-version teacher x subject x date
+        # cube, so changing a filter never scans the student rows
+        cube = get_class_cube(df, dataset_version)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            class_teacher = st.selectbox("Teacher", ["All"] + get_filter_options(df, dataset_version, 'teacher_name'), key="class_teacher")
+        with col2:
+            class_subject = st.selectbox("Subject", ["All"] + get_filter_options(df, dataset_version, 'subject'), key="class_subject")
+        with col3:
+            class_term = st.selectbox("Term", ["All"] + sorted(cube['Term'].unique()), key="class_term")
+        with col4:
+            months = roll_up_class_cube(cube, ['month'], Term=class_term).index
+            class_month = st.selectbox("Month", ["All"] + list(months), key="class_month")
+        
+        selection = dict(teacher_name=class_teacher, subject=class_subject, Term=class_term, month=class_month)
+        totals = roll_up_class_cube(cube, [], **selection).iloc[0]
+        if totals['row_count'] == 0:
+            st.info("No activity recorded for this selection.")
+        else:
+            metric_columns = st.columns(len(CLASS_TABLE_COLUMNS))
+            for metric_column, (column, label) in zip(metric_columns, CLASS_TABLE_COLUMNS.items()):
+                with metric_column:
+                    value = totals[column]
+                    if pd.isna(value):
+                        st.metric(label, "N/A")
+                    elif column in ('mastery_rate', 'average_growth'):
+                        st.metric(label, f"{value:.1f}" + ("%" if column == 'mastery_rate' else ""))
+                    else:
+                        st.metric(label, f"{int(value):,}")
+            
+            # Drill down by month, or roll up across subjects and teachers
+            class_tabs = st.tabs(["Monthly Trend", "By Subject", "By Teacher"])
+            with class_tabs[0]:
+                st.plotly_chart(get_class_figure(df, dataset_version, class_teacher, class_subject, class_term), use_container_width=True)
+            for class_tab, level in zip(class_tabs[1:], ['subject', 'teacher_name']):
+                with class_tab:
+                    table = roll_up_class_cube(cube, [level], **{column: value for column, value in selection.items() if column != level})
+                    table.index.name = None
+                    st.dataframe(table[list(CLASS_TABLE_COLUMNS)].rename(columns=CLASS_TABLE_COLUMNS), use_container_width=True)
+    
+    # Cohort View Tab
+    with tab5:
+        st.title("Cohort View")
+        
+        # Every student at once: scatter points go to the browser as WebGL markers
+        # (sampled above COHORT_SCATTER_MAX_POINTS), histograms and densities are
+        # binned here so only the counts are sent
+        points = get_cohort_points(df, dataset_version)
+        metric_names = list(COHORT_METRICS)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            cohort_subject = st.selectbox("Subject", ["All Subjects"] + cohort_subjects(points), key="cohort_subject")
+        with col2:
+            x_metric = st.selectbox("X Axis", metric_names, index=metric_names.index('starting_level'),
+                                    format_func=COHORT_METRICS.get, key="cohort_x")
+        with col3:
+            y_metric = st.selectbox("Y Axis", metric_names, index=metric_names.index('ending_level'),
+                                    format_func=COHORT_METRICS.get, key="cohort_y")
+        subject = None if cohort_subject == "All Subjects" else cohort_subject
+        
+        shown = points if subject is None else points[points['subject'] == subject]
+        st.caption(f"{shown['student_id'].nunique():,} students, {len(shown):,} student-subject points")
+        
+        # A view switch rather than tabs: tabs would build and send every chart on every
+        # rerun, the scatter's points included, even when it is never looked at
+        cohort_kind = st.radio(
+            "Chart", list(COHORT_CHARTS), index=list(COHORT_CHARTS).index('density'),
+            format_func=str.title, horizontal=True, key="cohort_chart"
+        )
+        st.plotly_chart(get_cohort_figure(df, dataset_version, cohort_kind, x_metric, y_metric, subject), use_container_width=True)
+    
+    # Raw Data Tab
+    with tab6:
         st.title("Raw Data")
         
         # Add file uploader
         uploaded_file = st.file_uploader("Upload CSV file", type=['csv'], key="data_upload")
         
         if uploaded_file is not None:
-            # Process the uploaded file
-            df_processed, issues = process_uploaded_csv(uploaded_file)
+            # Hash each uploaded file once per session; the store processes each content once
+            upload_versions = st.session_state.setdefault('upload_versions', {})
+            if uploaded_file.file_id not in upload_versions:
+                upload_versions[uploaded_file.file_id] = upload_version(uploaded_file)
+            upload = publish_upload(dataset_store, upload_versions[uploaded_file.file_id], uploaded_file)
+            df_processed, issues = upload['df'], upload['issues']
             
             if df_processed is not None:
+                # Switch this session to the new dataset once; the other tabs render it on the rerun
+                if st.session_state.get('dataset_switched') != uploaded_file.file_id:
+                    st.session_state['dataset_switched'] = uploaded_file.file_id
+                    st.session_state['dataset_request'] = upload_versions[uploaded_file.file_id]
+                    st.experimental_rerun()
+                
                 # Display success message
-                st.success("File processed successfully!")
+                st.success("File processed successfully! It is now available to everyone in the Dataset selector in the sidebar.")
                 
                 # Display processed data
                 st.subheader("Processed Data")
-                st.dataframe(df_processed)
-                
-                # Add download button for processed data
-                csv = df_processed.to_csv(index=False)
-                st.download_button(
-                    label="Download Processed Data",
-                    data=csv,
-                    file_name="processed_student_data.csv",
-                    mime="text/csv"
+                display_raw_data(
+                    df_processed, upload_versions[uploaded_file.file_id], "processed_data",
+                    "Download Processed Data", "processed_student_data.csv"
                 )
-                
-                # Update the main dataframe with the processed data
-                df = df_processed
             else:
                 # Display issues
                 st.error("Issues found in the uploaded file:")
@@ -2440,15 +3809,6 @@ if df is not None:
         
         # Display original data
         st.subheader("Original Data")
-        st.dataframe(df)
-        
-        # Download button for original data
-        csv = df.to_csv(index=False)
-        st.download_button(
-            label="Download Original Data",
-            data=csv,
-            file_name="student_data.csv",
-            mime="text/csv"
-        )
+        display_raw_data(df, dataset_version, "original_data", "Download Original Data", "student_data.csv")
 else:
     st.error("Failed to load data. Please check if the data file exists and is properly formatted.") 